@@ -1,47 +1,763 @@
-import gspread
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-import os
-from pydantic import BaseModel
-from typing import List
-from fastapi import FastAPI, HTTPException, Body, Query
+import asyncio
+import bisect
+import contextvars
+import csv
+import importlib.util
 import io
+import os
+import queue
+import random
+import re
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from cachetools import TTLCache
+from googleapiclient.errors import HttpError
 import json
+import threading
+
+
+GOOGLE_API_SCOPES = ['https://www.googleapis.com/auth/drive']
+
+_credentials = None
+_credentials_lock = threading.Lock()
+
+# Parse the service account key on first use rather than at import time
+def get_credentials():
+    global _credentials
+    if _credentials is None:
+        with _credentials_lock:
+            if _credentials is None:
+                from google.oauth2 import service_account
+                service_account_info = json.loads(os.getenv("GOOGLE_SHEETS_JSON_KEY_CONTENTS"))
+                _credentials = service_account.Credentials.from_service_account_info(service_account_info, scopes=GOOGLE_API_SCOPES)
+    return _credentials
+
+# "google" talks to the real APIs; "fake" uses the in-process stand-in in fake_google.py
+GOOGLE_API_BACKEND = os.getenv("GOOGLE_API_BACKEND", "google")
+
+# Service object that builds the real Google API client on first attribute access.
+# The client is built from the discovery documents bundled with google-api-python-client,
+# so neither a cold start nor the first request fetches them over the network.
+# set() swaps in another client with the same interface (e.g. a fake_google service).
+class LazyService:
+    def __init__(self, service_name, version):
+        self.service_name = service_name
+        self.version = version
+        self._service = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None and GOOGLE_API_BACKEND == "fake":
+                    from fake_google import default_backend
+                    self._service = default_backend().drive if self.service_name == "drive" else default_backend().sheets
+                elif self._service is None:
+                    from googleapiclient.discovery import build
+                    self._service = build(self.service_name, self.version, credentials=get_credentials(),
+                                          static_discovery=True, cache_discovery=False)
+        return self._service
+
+    def set(self, service):
+        with self._lock:
+            self._service = service
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+# Create service objects to interact with the Drive and Sheets APIs
+drive_service = LazyService('drive', 'v3')
+spreadsheet_service = LazyService('sheets', 'v4')
+
+# Bounded pool that runs the blocking Google API round trips off the event loop
+GOOGLE_API_MAX_WORKERS = int(os.getenv("GOOGLE_API_MAX_WORKERS", "16"))
+_api_executor = ThreadPoolExecutor(max_workers=GOOGLE_API_MAX_WORKERS, thread_name_prefix="google-api")
+
+# The discovery client shares a single httplib2.Http, which is not thread-safe. Requests are
+# instead executed on keep-alive connections checked out of a pool, one caller at a time.
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", str(GOOGLE_API_MAX_WORKERS)))
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "60"))
+
+# Connection-level counters for the pooled transport
+transport_stats = {
+    "requests": 0,
+    "connections_new": 0,
+    "connections_reused": 0,
+    "handshake_seconds_total": 0.0,
+    "handshake_seconds_max": 0.0,
+    "pool_waits": 0,
+}
+_transport_stats_lock = threading.Lock()
+
+def record_transport_stat(name, value=1):
+    with _transport_stats_lock:
+        transport_stats[name] += value
+        if name == "handshake_seconds_total":
+            transport_stats["handshake_seconds_max"] = max(transport_stats["handshake_seconds_max"], value)
+
+# httplib2.Http that counts new vs reused connections and times the TCP/TLS handshake
+@lru_cache(maxsize=None)
+def metered_http_class():
+    import httplib2
+
+    class MeteredHttp(httplib2.Http):
+        def _conn_request(self, conn, request_uri, method, body, headers):
+            record_transport_stat("requests")
+            if conn.sock is None:
+                start = time.perf_counter()
+                try:
+                    conn.connect()
+                except Exception:
+                    # Leave it to httplib2 to retry the connect and map the error
+                    conn.close()
+                else:
+                    record_transport_stat("connections_new")
+                    record_transport_stat("handshake_seconds_total", time.perf_counter() - start)
+            else:
+                record_transport_stat("connections_reused")
+            return super()._conn_request(conn, request_uri, method, body, headers)
+
+    return MeteredHttp
+
+# Bounded pool of authorized HTTP clients, each keeping its own keep-alive connections
+class HttpPool:
+    def __init__(self, size):
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def _create(self, credentials):
+        import google_auth_httplib2
+        return google_auth_httplib2.AuthorizedHttp(credentials, http=metered_http_class()(timeout=GOOGLE_HTTP_TIMEOUT))
+
+    def _acquire(self, credentials):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self.created < self.size
+            if can_create:
+                self.created += 1
+        if not can_create:
+            record_transport_stat("pool_waits")
+            return self._idle.get()
+        try:
+            return self._create(credentials)
+        except Exception:
+            with self._lock:
+                self.created -= 1
+            raise
+
+    @contextmanager
+    def connection(self, credentials):
+        http = self._acquire(credentials)
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
+
+    def stats(self):
+        return {"size": self.size, "created": self.created, "idle": self._idle.qsize()}
+
+http_pool = HttpPool(GOOGLE_HTTP_POOL_SIZE)
+
+# Client-side rate limiting: one token bucket per quota, in requests per minute. A service
+# account is a single user, so the per-user quotas are the binding ones; lower them when several
+# instances share a project. Part of each minute's quota is allowed as a burst and the rest
+# refills steadily, so no 60-second window can exceed the quota.
+API_QUOTAS_PER_MINUTE = {
+    "drive": float(os.getenv("DRIVE_REQUESTS_PER_MINUTE", "12000")),
+    "sheets_read": float(os.getenv("SHEETS_READS_PER_MINUTE", "60")),
+    "sheets_write": float(os.getenv("SHEETS_WRITES_PER_MINUTE", "60")),
+}
+API_QUOTA_BURST_FRACTION = float(os.getenv("GOOGLE_API_BURST_FRACTION", "0.2"))
+SHEETS_READ_METHODS = {"get", "batchGet", "batchGetByDataFilter", "getByDataFilter"}
+
+# Retries with exponential backoff and full jitter, honouring Retry-After
+GOOGLE_API_MAX_RETRIES = int(os.getenv("GOOGLE_API_MAX_RETRIES", "5"))
+GOOGLE_API_BACKOFF_BASE = float(os.getenv("GOOGLE_API_BACKOFF_BASE", "0.5"))
+GOOGLE_API_BACKOFF_MAX = float(os.getenv("GOOGLE_API_BACKOFF_MAX", "32"))
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Calls that would create a duplicate (or fail with "already exists") if a 5xx hid a success;
+# these are only retried when Google says the request was rejected for quota
+NON_IDEMPOTENT_METHODS = {"drive.files.create", "drive.files.copy", "sheets.spreadsheets.values.append",
+                          "sheets.spreadsheets.batchUpdate"}
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_fraction):
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.rate = max(per_minute - self.capacity, 1.0) / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Take the tokens if they are available; otherwise return how long until they will be
+    def try_acquire(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    # Wait on the event loop until enough tokens are available and return how long we waited.
+    # Waiting here rather than in a pool thread keeps one empty bucket from starving other APIs.
+    async def acquire(self, tokens=1):
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+rate_limiters = {name: TokenBucket(per_minute, API_QUOTA_BURST_FRACTION) for name, per_minute in API_QUOTAS_PER_MINUTE.items()}
+
+# Per-quota counters for throttling and retries
+quota_stats = {name: {"attempts": 0, "throttled": 0, "throttle_wait_seconds": 0.0, "retries": 0,
+                      "rate_limited_responses": 0, "gave_up": 0}
+               for name in list(API_QUOTAS_PER_MINUTE) + ["other"]}
+_quota_stats_lock = threading.Lock()
+
+def record_quota_stat(bucket, name, value=1):
+    with _quota_stats_lock:
+        quota_stats[bucket or "other"][name] += value
+
+# Batch requests (googleapiclient BatchHttpRequest) carry their calls in _requests; every call
+# in a batch counts against quota on its own
+def batched_requests(request):
+    if not hasattr(request, "_batch_uri"):
+        return None
+    return list(request._requests.values())
+
+# Quota bucket a request draws from, based on its discovery method id
+def quota_bucket(request):
+    inner = batched_requests(request)
+    if inner:
+        request = inner[0]
+    method_id = getattr(request, "methodId", None) or ""
+    if method_id.startswith("drive."):
+        return "drive"
+    if method_id.startswith("sheets."):
+        return "sheets_read" if method_id.rsplit(".", 1)[-1] in SHEETS_READ_METHODS else "sheets_write"
+    return None
 
-
-
-# Create a service object to interact with the Drive API
-SERVICE_ACCOUNT_JSON_PATH = json.loads(os.getenv("GOOGLE_SHEETS_JSON_KEY_CONTENTS"))
-
-creds = service_account.Credentials.from_service_account_info(SERVICE_ACCOUNT_JSON_PATH, scopes=['https://www.googleapis.com/auth/drive'])
-drive_service = build('drive', 'v3', credentials=creds)
-spreadsheet_service = build('sheets', 'v4', credentials=creds)
+def error_reason(error):
+    try:
+        errors = json.loads(error.content)["error"].get("errors") or [{}]
+        return errors[0].get("reason")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+def is_rate_limited(error):
+    return isinstance(error, HttpError) and (
+        error.resp.status == 429 or (error.resp.status == 403 and error_reason(error) in RATE_LIMIT_REASONS))
+
+# Seconds to wait before retrying a failed request, or None if it should not be retried
+def retry_delay(request, error, attempt):
+    if attempt >= GOOGLE_API_MAX_RETRIES:
+        return None
+    rate_limited = is_rate_limited(error)
+    if not rate_limited:
+        # A failed batch may have applied some of its calls, so it is treated like a create
+        if getattr(request, "methodId", None) in NON_IDEMPOTENT_METHODS or batched_requests(request) is not None:
+            return None
+        if isinstance(error, HttpError):
+            if error.resp.status not in RETRYABLE_STATUSES:
+                return None
+        elif not isinstance(error, (ConnectionError, TimeoutError)):
+            return None
+    delay = random.uniform(0, min(GOOGLE_API_BACKOFF_MAX, GOOGLE_API_BACKOFF_BASE * 2 ** attempt))
+    if isinstance(error, HttpError):
+        try:
+            delay = max(delay, float(error.resp.get("retry-after", 0)))
+        except ValueError:
+            pass
+    return delay
+
+# Latency histograms for endpoints and Google calls, exposed at /metrics in the Prometheus text format
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Add a Server-Timing header breaking each response down by Google method (opt-in: it names internal calls)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+def metric_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metric_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{metric_label_value(value)}"' for name, value in zip(names, values)) + "}"
+
+class LatencyHistogram:
+    def __init__(self, name, help, labelnames, buckets=METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                series["buckets"][index] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: {"buckets": list(values["buckets"]), "sum": values["sum"], "count": values["count"]}
+                      for labels, values in self._series.items()}
+        names = self.labelnames + ("le",)
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values["buckets"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{metric_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{metric_labels(names, labels + ('+Inf',))} {values['count']}")
+            lines.append(f"{self.name}_sum{metric_labels(self.labelnames, labels)} {values['sum']:.6f}")
+            lines.append(f"{self.name}_count{metric_labels(self.labelnames, labels)} {values['count']}")
+        return lines
+
+endpoint_latency = LatencyHistogram("http_request_duration_seconds",
+                                    "Time until the last response body chunk per endpoint", ("method", "route", "status"))
+# One observation per attempt, so retries and throttled calls show up on their own
+api_latency = LatencyHistogram("google_api_request_duration_seconds",
+                               "Google API round trip per attempt", ("api_method", "status"))
+api_response_bytes = {}
+_api_response_bytes_lock = threading.Lock()
+
+# Per-request list of (name, seconds) for the Server-Timing header; None outside a timed request.
+# execute copies the context into the worker thread, so appends land in the caller's list.
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def record_timing(name, seconds):
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+def record_api_call(api_method, status, response_bytes, seconds):
+    api_latency.observe((api_method, str(status)), seconds)
+    with _api_response_bytes_lock:
+        api_response_bytes[api_method] = api_response_bytes.get(api_method, 0) + response_bytes
+    record_timing(api_method, seconds)
+
+# Wrap a request's postproc (and every call's in a batch) to capture the HTTP status and body size
+@contextmanager
+def metered_postproc(request, observed):
+    wrapped = []
+    for call in batched_requests(request) or [request]:
+        postproc = getattr(call, "postproc", None)
+        if postproc is None:
+            continue
+
+        def metered(resp, content, postproc=postproc):
+            observed["status"] = resp.status
+            observed["bytes"] += len(content or b"")
+            return postproc(resp, content)
+        call.postproc = metered
+        wrapped.append((call, postproc))
+    try:
+        yield
+    finally:
+        for call, postproc in wrapped:
+            call.postproc = postproc
+
+# Run a prepared Drive/Sheets request once on a pooled connection
+def execute_once(request):
+    # Requests built by the discovery client carry the shared AuthorizedHttp; anything else
+    # (e.g. a stand-in client) brings its own transport. A batch uses its first call's credentials.
+    inner = batched_requests(request)
+    credentials = getattr(getattr(inner[0] if inner else request, "http", None), "credentials", None)
+    api_method = getattr(request, "methodId", None) or ("batch" if inner is not None else "unknown")
+    observed = {"status": None, "bytes": 0}
+    start = time.perf_counter()
+    try:
+        with metered_postproc(request, observed):
+            if credentials is None:
+                return request.execute()
+            with http_pool.connection(credentials) as http:
+                return request.execute(http=http)
+    except HttpError as e:
+        observed["status"] = e.resp.status
+        observed["bytes"] += len(e.content or b"")
+        raise
+    except Exception:
+        observed["status"] = "error"
+        raise
+    finally:
+        # A call with no postproc of its own (a batch whose parts all failed, a stand-in client) succeeded
+        record_api_call(api_method, observed["status"] or 200, observed["bytes"], time.perf_counter() - start)
+
+# Run a prepared Drive/Sheets request under its quota's rate limit, retrying throttling,
+# server errors and dropped connections with backoff. Quota and backoff waits happen on the
+# event loop; only the round trip itself occupies a pool thread.
+async def execute(request):
+    loop = asyncio.get_running_loop()
+    bucket = quota_bucket(request)
+    tokens = len(batched_requests(request) or [request])
+    attempt = 0
+    while True:
+        record_quota_stat(bucket, "attempts")
+        if bucket is not None:
+            waited = await rate_limiters[bucket].acquire(tokens)
+            if waited:
+                record_quota_stat(bucket, "throttled")
+                record_quota_stat(bucket, "throttle_wait_seconds", waited)
+                record_timing("quota_wait", waited)
+        try:
+            return await loop.run_in_executor(_api_executor, contextvars.copy_context().run, execute_once, request)
+        except Exception as e:
+            if is_rate_limited(e):
+                record_quota_stat(bucket, "rate_limited_responses")
+            delay = retry_delay(request, e, attempt)
+            if delay is None:
+                if attempt:
+                    record_quota_stat(bucket, "gave_up")
+                raise
+            record_quota_stat(bucket, "retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+# Single-flight: concurrent calls with the same key share one in-flight call and its result.
+# The shared call keeps running if the caller that started it goes away.
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key, call):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            flight = self._flights[key] = asyncio.ensure_future(call())
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+# Sequence number of the last write to each spreadsheet/folder, recorded wherever our write
+# endpoints invalidate a cache. Bounded: resources dropped from the map fall back to the newest
+# dropped sequence, which is never older than their real one.
+WRITE_LOG_MAXSIZE = int(os.getenv("WRITE_LOG_MAXSIZE", "10000"))
+
+class WriteLog:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.sequence = 0
+        self._last = OrderedDict()
+        self._floor = 0
+
+    def record(self, resource_id):
+        self.sequence += 1
+        self._last[resource_id] = self.sequence
+        self._last.move_to_end(resource_id)
+        while len(self._last) > self.maxsize:
+            _, dropped = self._last.popitem(last=False)
+            self._floor = max(self._floor, dropped)
+
+    # Last write to resource_id; None stands for "any resource" (e.g. a listing of the whole Drive)
+    def generation(self, resource_id):
+        if resource_id is None:
+            return self.sequence
+        return self._last.get(resource_id, self._floor)
+
+write_log = WriteLog(WRITE_LOG_MAXSIZE)
+
+# Identical concurrent reads (same method and URI, which carries every parameter) share one
+# upstream request. Callers get the same response object and must not modify it. Only plain reads
+# opt in: a read that feeds a write (find the next empty row, diff before a sync, look up a
+# permission) must not join a request that started before an earlier write landed. The key also
+# carries the resource's write generation, so a read issued after one of our writes never joins
+# a flight that started before it.
+read_flights = SingleFlight()
+
+def read_flight_key(request, resource_id):
+    if getattr(request, "method", None) != "GET" or not getattr(request, "uri", None):
+        return None
+    return request.methodId, request.uri, write_log.generation(resource_id)
+
+# Every endpoint awaits its Drive/Sheets requests through here so a Google round trip
+# never blocks the event loop. coalesce=True lets an identical in-flight read of resource_id
+# (the spreadsheet or folder it reads; None for anything) answer it.
+async def execute_async(request, coalesce=False, resource_id=None):
+    key = read_flight_key(request, resource_id) if coalesce else None
+    if key is None:
+        return await execute(request)
+    return await read_flights.run(key, lambda: execute(request))
+
+# Partial-response masks: each Drive/Sheets call asks only for the fields its caller reads
+FIELD_MASKS = {
+    # Drive
+    "folder_listing": "files(id, name, createdTime)",
+    "drive_listing": "files(id, name, mimeType, createdTime, webViewLink)",
+    "tree_listing": "files(id, name, mimeType, createdTime, parents)",
+    "mirror_listing": "files(id, name, mimeType, createdTime, webViewLink, parents, trashed)",
+    "mirror_file": "id, name, mimeType, createdTime, webViewLink, parents, trashed",
+    "mirror_changes": "nextPageToken, newStartPageToken, changes(changeType, fileId, removed, file(id, name, mimeType, createdTime, webViewLink, parents, trashed))",
+    "file_name": "name",
+    "file_lookup": "files(id)",
+    "created_file": "id",
+    "permission_lookup": "nextPageToken, permissions(id, emailAddress, role)",
+    "permission": "id",
+    # Sheets
+    "sheet_names": "sheets.properties.title",
+    "spreadsheet_update": "spreadsheetId",
+    "values": "values",
+    "values_update": "updatedRange",
+    "values_batch_update": "totalUpdatedCells",
+    "values_batch": "valueRanges(values)",
+    "sheet_grid": "sheets.properties.gridProperties.rowCount",
+    "values_append": "updates(updatedRange, updatedRows)",
+}
+
+# Build a Drive/Sheets request that only returns the fields named by FIELD_MASKS[mask]
+def masked(method, mask, **kwargs):
+    return method(fields=FIELD_MASKS[mask], **kwargs)
+
+# Drive/Sheets metadata (sheet names, file names, folder listings) is cached for a short TTL.
+# Entries are keyed (kind, resource_id), and our own write endpoints drop every entry of the
+# resource they touched.
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "300"))
+METADATA_CACHE_MAXSIZE = int(os.getenv("METADATA_CACHE_MAXSIZE", "1024"))
+METADATA_CACHE_MAX_LISTING = int(os.getenv("METADATA_CACHE_MAX_LISTING", "10000"))
+
+# Bounded TTL cache with LRU eviction and hit/miss counters
+class MetadataCache:
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self.generation = 0
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, key):
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, value
+
+    def store(self, key, value, generation):
+        with self._lock:
+            if generation == self.generation:
+                self._cache[key] = value
+
+    # Concurrent misses for the same key wait for one load. Loads are keyed by generation too,
+    # so a miss after an invalidation never joins a load that started before it.
+    async def get_or_load(self, key, loader):
+        found, value = self.lookup(key)
+        if found:
+            return value
+        generation = self.generation
+
+        async def load():
+            value = await loader()
+            self.store(key, value, generation)
+            return value
+        return await self._loads.run((key, generation), load)
+
+    def invalidate(self, resource_id):
+        write_log.record(resource_id)
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._cache.keys() if key[1] == resource_id]:
+                self._cache.pop(key, None)
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "coalesced_loads": self._loads.coalesced, "size": len(self._cache), "maxsize": self._cache.maxsize,
+                    "ttl": self._cache.ttl}
+
+metadata_cache = MetadataCache(METADATA_CACHE_MAXSIZE, METADATA_CACHE_TTL)
 
 # Create FastAPI app
 app = FastAPI()
+
+# Route template (e.g. /folder_tree/{folder_id}) for the endpoint a request was routed to
+@lru_cache(maxsize=None)
+def route_templates():
+    return {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+
+# Plain ASGI middleware that records every endpoint's latency up to the last body chunk, so
+# streamed responses are timed in full. The Server-Timing header goes out with the headers and
+# covers the Google calls made until then.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = [] if SERVER_TIMING else None
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = None
+        observed = False
+
+        def observe():
+            nonlocal observed
+            if not observed:
+                observed = True
+                route = route_templates().get(scope.get("endpoint"), "unmatched")
+                endpoint_latency.observe((scope["method"], route, str(status or 500)), time.perf_counter() - start)
+
+        async def send_metered(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    header = server_timing_header(timings, time.perf_counter() - start)
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_metered)
+        finally:
+            observe()
+            request_timings.reset(token)
+
+app.add_middleware(MetricsMiddleware)
+
+# Sum the Google calls of one request per method, e.g. 'sheets.spreadsheets.values.get;dur=41.2;desc="2 calls"'
+def server_timing_header(timings, elapsed):
+    totals = {}
+    for name, seconds in list(timings):
+        total, calls = totals.get(name, (0.0, 0))
+        totals[name] = (total + seconds, calls + 1)
+    entries = [f"total;dur={elapsed * 1000:.1f}"]
+    for name, (total, calls) in totals.items():
+        entries.append(f'{name};dur={total * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"')
+    return ", ".join(entries)
+
 @app.get("/")
 async def root():
   return{"message":"Created by Tran Chi Toan - chitoantran@gmail.com"}
 
+# Endpoint to inspect runtime counters
+@app.get("/stats")
+async def stats_endpoint():
+    with _transport_stats_lock:
+        transport = dict(transport_stats)
+    transport["pool"] = http_pool.stats()
+    with _quota_stats_lock:
+        quotas = {name: dict(counters) for name, counters in quota_stats.items()}
+    stats = {"transport": transport, "metadata_cache": metadata_cache.stats(),
+             "worksheet_snapshots": worksheet_snapshots.stats(), "quotas": quotas, "coalesced_reads": read_flights.stats()}
+    if write_behind is not None:
+        stats["write_behind"] = write_behind.stats()
+    if drive_mirror is not None:
+        stats["drive_mirror"] = drive_mirror.stats()
+    stats["jobs"] = job_runner.stats()
+    return stats
+
+# Counters from /stats as Prometheus samples, one per numeric value
+def stats_metric_lines(prefix, values, labelnames=(), labels=()):
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"{prefix}_{key}{metric_labels(labelnames, labels)} {value}")
+    return lines
+
+# Endpoint exposing latency histograms and runtime counters in the Prometheus text format
+@app.get("/metrics")
+async def metrics_endpoint():
+    lines = endpoint_latency.render() + api_latency.render()
+    lines += ["# HELP google_api_response_bytes_total Response body bytes per Google method",
+              "# TYPE google_api_response_bytes_total counter"]
+    with _api_response_bytes_lock:
+        response_bytes = sorted(api_response_bytes.items())
+    for api_method, total in response_bytes:
+        lines.append(f"google_api_response_bytes_total{metric_labels(('api_method',), (api_method,))} {total}")
+    with _transport_stats_lock:
+        lines += stats_metric_lines("google_transport", transport_stats)
+    lines += stats_metric_lines("google_transport_pool", http_pool.stats())
+    with _quota_stats_lock:
+        for name, counters in sorted(quota_stats.items()):
+            lines += stats_metric_lines("google_quota", counters, ("bucket",), (name,))
+    for name, cache in (("metadata", metadata_cache), ("worksheet_snapshots", worksheet_snapshots)):
+        lines += stats_metric_lines("cache", cache.stats(), ("cache",), (name,))
+    lines += stats_metric_lines("coalesced_reads", read_flights.stats())
+    if write_behind is not None:
+        lines += stats_metric_lines("write_behind", write_behind.stats())
+    if drive_mirror is not None:
+        lines += stats_metric_lines("drive_mirror", drive_mirror.stats())
+    lines += stats_metric_lines("jobs", job_runner.stats())
+    return Response(content="\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+# Endpoint to rebuild the Drive mirror from a full listing
+@app.post("/drive_mirror/resync")
+async def drive_mirror_resync_endpoint():
+    if drive_mirror is None:
+        raise HTTPException(status_code=404, detail="The Drive mirror is not enabled (set DRIVE_MIRROR=1)")
+    try:
+        await drive_mirror.resync()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return drive_mirror.stats()
+
 class CreateGoogleSheetRequest(BaseModel):
     new_spreadsheet_title: str
     permissions_email: str
     source_spreadsheet_id: str
     folder_id: str
+    background: bool = False  # Return a job id at once and copy in the background (poll /jobs/{job_id})
 
-def create_google_sheet(source_spreadsheet_id, new_spreadsheet_title, permissions_email, folder_id):
+# Copy a spreadsheet into a folder and return the new file's ID
+async def copy_spreadsheet(source_spreadsheet_id, new_spreadsheet_title, folder_id):
     # Create a copy of the source spreadsheet with the specified title
     copied_spreadsheet = {
         'name': new_spreadsheet_title,
         'parents': [folder_id]
     }
-    new_spreadsheet = drive_service.files().copy(
+    new_spreadsheet = await execute_async(masked(
+        drive_service.files().copy, "created_file" if drive_mirror is None else "mirror_file",
         fileId=source_spreadsheet_id,
         body=copied_spreadsheet
-    ).execute()
+    ))
+    metadata_cache.invalidate(folder_id)
+    if drive_mirror is not None:
+        drive_mirror.add(new_spreadsheet)
+    return new_spreadsheet['id']
 
+async def create_google_sheet(source_spreadsheet_id, new_spreadsheet_title, permissions_email, folder_id):
     # # Get the file ID of the copied spreadsheet
-    new_spreadsheet_id = new_spreadsheet['id']
+    new_spreadsheet_id = await copy_spreadsheet(source_spreadsheet_id, new_spreadsheet_title, folder_id)
 
     # # Define permissions for write access to the specified email address
     # permissions = {
@@ -61,13 +777,15 @@ def create_google_sheet(source_spreadsheet_id, new_spreadsheet_title, permission
 
 # Endpoint to create a Google Sheet with copy and permissions
 @app.post("/create_google_sheet/")
-def create_google_sheet_endpoint(request_data: CreateGoogleSheetRequest):
+async def create_google_sheet_endpoint(request_data: CreateGoogleSheetRequest):
     source_spreadsheet_id = request_data.source_spreadsheet_id
     new_spreadsheet_title = request_data.new_spreadsheet_title
     permissions_email = request_data.permissions_email
     folder_id = request_data.folder_id  # Destination folder ID
 
-    web_view_link = create_google_sheet(source_spreadsheet_id, new_spreadsheet_title, permissions_email, folder_id)
+    if request_data.background:
+        return job_accepted(await job_runner.submit("create_google_sheet", request_data))
+    web_view_link = await create_google_sheet(source_spreadsheet_id, new_spreadsheet_title, permissions_email, folder_id)
     return {"message": f"Success! New Google Sheet created: {web_view_link}"}
 
 # Pydantic model for folder creation request
@@ -76,29 +794,399 @@ class CreateFolderRequest(BaseModel):
     folder_name: str
 
 # Function to create a Google Drive folder
-def create_folder(parent_folder_id, folder_name):
+async def create_folder(parent_folder_id, folder_name):
     folder_metadata = {
         'name': folder_name,
         'parents':[parent_folder_id],
         'mimeType': 'application/vnd.google-apps.folder'
     }
-    folder = drive_service.files().create(body=folder_metadata, fields='id').execute()
+    folder = await execute_async(masked(drive_service.files().create, "created_file" if drive_mirror is None else "mirror_file",
+                                        body=folder_metadata))
+    metadata_cache.invalidate(parent_folder_id)
+    if drive_mirror is not None:
+        drive_mirror.add(folder)
 
     web_view_link = f"https://drive.google.com/drive/u/0/folders/{folder.get('id')}"
     return folder.get('id'), web_view_link
 
 # Endpoint to create a Google Drive folder
 @app.post("/create_folder")
-def create_google_drive_folder_endpoint(request_data: CreateFolderRequest):
+async def create_google_drive_folder_endpoint(request_data: CreateFolderRequest):
     folder_name = request_data.folder_name
     parent_folder_id = request_data.parent_folder_id
-    folder_id, folder_url = create_folder(parent_folder_id,folder_name)
+    folder_id, folder_url = await create_folder(parent_folder_id,folder_name)
     return {"message": f"Folder '{folder_name}' created with ID {folder_id} : {folder_url}"}
 
+# Bulk provisioning: folders and spreadsheet copies from one manifest. Items refer to folders
+# created earlier in the same manifest by key; at most PROVISION_CONCURRENCY Drive calls run at once.
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", "4"))
+
+# Pydantic model for one folder in a provisioning manifest; give exactly one of parent_folder_id
+# (an existing Drive folder) or parent (the key of another folder in the manifest)
+class ProvisionFolder(BaseModel):
+    key: str
+    folder_name: str
+    parent_folder_id: Optional[str] = None
+    parent: Optional[str] = None
+
+# Pydantic model for one spreadsheet copy; folder_id or folder (a manifest folder key), as above
+class ProvisionCopy(BaseModel):
+    source_spreadsheet_id: str
+    new_spreadsheet_title: str
+    folder_id: Optional[str] = None
+    folder: Optional[str] = None
+
+# Pydantic model for a provisioning manifest
+class ProvisionRequest(BaseModel):
+    folders: List[ProvisionFolder] = []
+    copies: List[ProvisionCopy] = []
+    concurrency: Optional[int] = Field(None, ge=1, le=GOOGLE_API_MAX_WORKERS)
+
+# Check manifest references; raises ValueError for duplicate or unknown keys and parent cycles
+def validate_manifest(manifest):
+    folders = {}
+    for folder in manifest.folders:
+        if folder.key in folders:
+            raise ValueError(f"Duplicate folder key '{folder.key}'")
+        if (folder.parent_folder_id is None) == (folder.parent is None):
+            raise ValueError(f"Folder '{folder.key}' needs exactly one of parent_folder_id or parent")
+        folders[folder.key] = folder
+    for folder in manifest.folders:
+        chain = {folder.key}
+        parent = folder.parent
+        while parent is not None:
+            if parent not in folders:
+                raise ValueError(f"Folder '{folder.key}' refers to unknown folder '{parent}'")
+            if parent in chain:
+                raise ValueError(f"Folder '{folder.key}' is part of a parent cycle")
+            chain.add(parent)
+            parent = folders[parent].parent
+    for index, copy in enumerate(manifest.copies):
+        if (copy.folder_id is None) == (copy.folder is None):
+            raise ValueError(f"Copy {index} needs exactly one of folder_id or folder")
+        if copy.folder is not None and copy.folder not in folders:
+            raise ValueError(f"Copy {index} refers to unknown folder '{copy.folder}'")
+
+# Run a manifest. Every item waits for the folder it goes into, and a failure only skips the
+# items inside the failed folder. Returns per-item results in manifest order.
+async def provision(manifest):
+    semaphore = asyncio.Semaphore(manifest.concurrency or PROVISION_CONCURRENCY)
+    created = {folder.key: asyncio.get_running_loop().create_future() for folder in manifest.folders}
+
+    async def destination(folder_id, key):
+        if folder_id is not None:
+            return folder_id
+        folder_id = await created[key]
+        if folder_id is None:
+            raise LookupError(f"folder '{key}' was not created")
+        return folder_id
+
+    async def make_folder(folder):
+        result = {"key": folder.key, "folder_name": folder.folder_name}
+        try:
+            parent_id = await destination(folder.parent_folder_id, folder.parent)
+        except LookupError as e:
+            created[folder.key].set_result(None)
+            return {**result, "status": "skipped", "error": f"Parent {e}"}
+        try:
+            async with semaphore:
+                folder_id, folder_url = await create_folder(parent_id, folder.folder_name)
+        except Exception as e:
+            created[folder.key].set_result(None)
+            return {**result, "status": "failed", "error": str(e)}
+        created[folder.key].set_result(folder_id)
+        return {**result, "status": "created", "id": folder_id, "url": folder_url}
+
+    async def make_copy(copy):
+        result = {"source_spreadsheet_id": copy.source_spreadsheet_id, "new_spreadsheet_title": copy.new_spreadsheet_title}
+        try:
+            folder_id = await destination(copy.folder_id, copy.folder)
+        except LookupError as e:
+            return {**result, "status": "skipped", "error": f"Destination {e}"}
+        try:
+            async with semaphore:
+                spreadsheet_id = await copy_spreadsheet(copy.source_spreadsheet_id, copy.new_spreadsheet_title, folder_id)
+        except Exception as e:
+            return {**result, "status": "failed", "error": str(e)}
+        return {**result, "status": "created", "id": spreadsheet_id, "url": f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"}
+
+    results = await asyncio.gather(*(make_folder(folder) for folder in manifest.folders),
+                                   *(make_copy(copy) for copy in manifest.copies))
+    folders, copies = results[:len(manifest.folders)], results[len(manifest.folders):]
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("created", "failed", "skipped")}
+    return {"folders": folders, "copies": copies, **counts}
+
+# Endpoint to create a client's folders and spreadsheet copies in one call
+@app.post("/provision")
+async def provision_endpoint(request_data: ProvisionRequest):
+    try:
+        validate_manifest(request_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await provision(request_data)
+
+# Largest page the Drive files().list call accepts
+DRIVE_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Iterate over every page of a Drive files().list query, yielding (files, next_page_token).
+# With prefetch, the next page is already in flight while the caller handles the current one.
+# A limit caps the total number of files; the last token yielded resumes right after them.
+async def iter_drive_pages(q=None, mask="folder_listing", page_token=None, limit=None, prefetch=True, coalesce=False, resource_id=None):
+    def fetch(token, remaining):
+        kwargs = {
+            "fields": f"nextPageToken, {FIELD_MASKS[mask]}",
+            "pageSize": DRIVE_PAGE_SIZE if remaining is None else min(DRIVE_PAGE_SIZE, remaining),
+        }
+        if q:
+            kwargs["q"] = q
+        if token:
+            kwargs["pageToken"] = token
+        return asyncio.ensure_future(execute_async(drive_service.files().list(**kwargs), coalesce=coalesce, resource_id=resource_id))
+
+    remaining = limit
+    pending = fetch(page_token, remaining)
+    try:
+        while pending is not None:
+            response = await pending
+            pending = None
+            files = response.get('files', [])
+            if remaining is not None:
+                files = files[:remaining]
+                remaining -= len(files)
+            next_page_token = response.get('nextPageToken')
+            has_more = bool(next_page_token) and remaining != 0
+            if has_more and prefetch:
+                pending = fetch(next_page_token, remaining)
+            yield files, next_page_token
+            if has_more and pending is None:
+                pending = fetch(next_page_token, remaining)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+# Collect every file matching a Drive query across all pages
+async def list_all_drive_files(q=None, mask="folder_listing"):
+    files = []
+    async for page, _ in iter_drive_pages(q, mask):
+        files.extend(page)
+    return files
+
+# Local mirror of Drive file metadata, seeded with one full listing and then kept current with
+# changes().list from a stored page token. Listing and search endpoints answer from it when
+# DRIVE_MIRROR is set. Reads poll for changes once the mirror is DRIVE_MIRROR_MAX_LAG seconds old.
+DRIVE_MIRROR = os.getenv("DRIVE_MIRROR", "").lower() in ("1", "true", "yes")
+DRIVE_MIRROR_MAX_LAG = float(os.getenv("DRIVE_MIRROR_MAX_LAG", "10"))
+MIRROR_TOKEN_PREFIX = "mirror:"
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# Drive's "name contains" is a case-insensitive prefix match on the name or on any word in it
+def drive_name_contains(name, needle):
+    return re.search(r"(?<![0-9a-z])" + re.escape(needle.lower()), name.lower()) is not None
+
+class DriveMirror:
+    def __init__(self, max_lag):
+        self.max_lag = max_lag
+        self.files = {}
+        self.children = {}
+        self.page_token = None
+        self.synced_at = None
+        self.seeded_at = None
+        self.syncs = 0
+        self.resyncs = 0
+        self.changes_applied = 0
+        self.errors = 0
+        self._lock = asyncio.Lock()
+
+    def _remove(self, file_id):
+        file = self.files.pop(file_id, None)
+        if file is not None:
+            for parent in file.get('parents', []):
+                self.children.get(parent, {}).pop(file_id, None)
+
+    # Trashed files are kept: Drive listings without a trashed filter return them too
+    def _put(self, file):
+        self._remove(file['id'])
+        self.files[file['id']] = file
+        for parent in file.get('parents', []):
+            self.children.setdefault(parent, {})[file['id']] = file
+
+    # Full listing; the start token is taken first so changes made during the listing are replayed
+    async def seed(self):
+        start = await execute_async(drive_service.changes().getStartPageToken())
+        files = await list_all_drive_files(None, "mirror_listing")
+        self.files = {}
+        self.children = {}
+        for file in files:
+            self._put(file)
+        self.page_token = start['startPageToken']
+        self.seeded_at = self.synced_at = time.time()
+        self.resyncs += 1
+
+    # Apply every change since the stored page token
+    async def sync(self):
+        token = self.page_token
+        while token:
+            response = await execute_async(masked(drive_service.changes().list, "mirror_changes",
+                                                  pageToken=token, pageSize=DRIVE_PAGE_SIZE, includeRemoved=True))
+            for change in response.get('changes', []):
+                # Shared-drive changes (changeType "drive") carry no fileId and are not ours to mirror
+                if change.get('changeType', 'file') != 'file' or 'fileId' not in change:
+                    continue
+                if change.get('removed') or 'file' not in change:
+                    self._remove(change['fileId'])
+                else:
+                    self._put(change['file'])
+                self.changes_applied += 1
+            token = response.get('nextPageToken')
+            if response.get('newStartPageToken'):
+                self.page_token = response['newStartPageToken']
+        self.synced_at = time.time()
+        self.syncs += 1
+
+    # Called by our own Drive writes with the file they created, so reads see it before the
+    # Changes feed delivers it. Ignored until the mirror is seeded (the seed lists it anyway).
+    def add(self, file):
+        if self.page_token is not None:
+            self._put(file)
+
+    async def ensure_fresh(self):
+        async with self._lock:
+            if self.page_token is None:
+                await self.seed()
+            elif self.lag() >= self.max_lag:
+                try:
+                    await self.sync()
+                except HttpError as e:
+                    # An expired or invalid page token means the mirror can no longer catch up
+                    if e.resp.status not in (400, 404, 410):
+                        raise
+                    await self.seed()
+
+    async def resync(self):
+        async with self._lock:
+            await self.seed()
+
+    # Files matching a listing query, oldest first (ties by id) so offsets survive renames and moves
+    async def select(self, parent_id=None, mime_type=None, name_contains=None):
+        await self.ensure_fresh()
+        files = self.children.get(parent_id, {}).values() if parent_id is not None else self.files.values()
+        if mime_type is not None:
+            files = [file for file in files if file.get('mimeType') == mime_type]
+        if name_contains is not None:
+            files = [file for file in files if drive_name_contains(file.get('name', ''), name_contains)]
+        return sorted(files, key=lambda file: (file.get('createdTime', ''), file['id']))
+
+    # Seconds since the mirror last caught up with Drive
+    def lag(self):
+        return time.time() - self.synced_at if self.synced_at is not None else None
+
+    def stats(self):
+        lag = self.lag()
+        return {"files": len(self.files), "lag_seconds": round(lag, 3) if lag is not None else None,
+                "max_lag_seconds": self.max_lag, "seeded_at": self.seeded_at, "syncs": self.syncs,
+                "resyncs": self.resyncs, "changes_applied": self.changes_applied, "errors": self.errors}
+
+drive_mirror = DriveMirror(DRIVE_MIRROR_MAX_LAG) if DRIVE_MIRROR else None
+
+# Answer a listing from the mirror in the same shape as the Drive-backed response: only the
+# fields in the listing's mask, paged by "mirror:<offset>" tokens
+async def mirror_listing_response(mirror_filter, mask, transform, page_token=None, limit=None, format="json"):
+    offset = page_token[len(MIRROR_TOKEN_PREFIX):] if page_token else "0"
+    if not offset.isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid page_token {page_token}")
+    offset = int(offset)
+    files = await drive_mirror.select(**mirror_filter)
+    end = offset + limit if limit is not None else len(files)
+    next_page_token = f"{MIRROR_TOKEN_PREFIX}{end}" if end < len(files) else None
+    fields = [field.strip() for field in FIELD_MASKS[mask][len("files("):-1].split(",")]
+    page = [{field: file[field] for field in fields if field in file} for file in files[offset:end]]
+    if not page and not next_page_token:
+        return None
+    envelope = page_token is not None or limit is not None
+    media_type = NDJSON_MEDIA_TYPE if format == "ndjson" else "application/json"
+    return StreamingResponse(stream_drive_listing((page, next_page_token), None, transform, format, envelope), media_type=media_type)
+
+# Stream Drive listing pages to the client as they arrive, either as a JSON array or as NDJSON.
+# When the caller paginates (envelope), the JSON form becomes {"files": [...], "next_page_token": ...}
+# and the NDJSON form ends with a {"next_page_token": ...} line if more results remain.
+async def stream_drive_listing(first_page, pages, transform, format, envelope):
+    async def all_pages():
+        yield first_page
+        if pages is not None:
+            async for page in pages:
+                yield page
+
+    next_page_token = None
+    if format == "ndjson":
+        async for files, next_page_token in all_pages():
+            if files:
+                yield "".join(json.dumps(transform(item)) + "\n" for item in files)
+        if next_page_token:
+            yield json.dumps({"next_page_token": next_page_token}) + "\n"
+        return
+
+    yield '{"files": [' if envelope else "["
+    separator = ""
+    async for files, next_page_token in all_pages():
+        if files:
+            yield separator + ",".join(json.dumps(transform(item)) for item in files)
+            separator = ","
+    yield f'], "next_page_token": {json.dumps(next_page_token)}}}' if envelope else "]"
+
+# Pass listing pages through unchanged and cache the complete listing once the last page is in
+async def cache_listing_pages(pages, cache_key, generation):
+    files = []
+    async for page in pages:
+        if files is not None:
+            files = files + page[0] if len(files) + len(page[0]) <= METADATA_CACHE_MAX_LISTING else None
+        yield page
+    if files is not None:
+        metadata_cache.store(cache_key, files, generation)
+
+# Fetch the first page of a Drive listing, then stream the rest while later pages arrive.
+# Returns None when the very first page is empty so endpoints can keep their own empty response.
+# Full listings (no page_token/limit) with a cache_key are served from and saved to the metadata cache.
+# With the Drive mirror enabled, listings that pass a mirror_filter are answered locally instead;
+# if the mirror cannot be brought up to date the query goes to Drive.
+async def drive_listing_response(q, mask, transform, page_token=None, limit=None, format="json", cache_key=None, mirror_filter=None):
+    if drive_mirror is not None and mirror_filter is not None and (page_token is None or page_token.startswith(MIRROR_TOKEN_PREFIX)):
+        try:
+            return await mirror_listing_response(mirror_filter, mask, transform, page_token, limit, format)
+        except HTTPException:
+            raise
+        except Exception:
+            drive_mirror.errors += 1
+            if page_token is not None:
+                raise
+    media_type = NDJSON_MEDIA_TYPE if format == "ndjson" else "application/json"
+    use_cache = cache_key is not None and page_token is None and limit is None
+    if use_cache:
+        found, files = metadata_cache.lookup(cache_key)
+        if found:
+            if not files:
+                return None
+            return StreamingResponse(stream_drive_listing((files, None), None, transform, format, False), media_type=media_type)
+        generation = metadata_cache.generation
+
+    pages = iter_drive_pages(q, mask, page_token=page_token, limit=limit, coalesce=True,
+                             resource_id=cache_key[1] if cache_key is not None else None)
+    if use_cache:
+        pages = cache_listing_pages(pages, cache_key, generation)
+    first_page = await pages.__anext__()
+    if not first_page[0] and not first_page[1]:
+        await pages.aclose()
+        return None
+    envelope = page_token is not None or limit is not None
+    return StreamingResponse(stream_drive_listing(first_page, pages, transform, format, envelope), media_type=media_type)
+
 # Define Pydantic model for request parameters
 class SearchFoldersRequest(BaseModel):
     keywords: str
     parent_folder_id: str
+    page_token: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)
+    format: Literal["json", "ndjson"] = "json"
 
 # Define Pydantic model for response format
 class FolderInfo(BaseModel):
@@ -107,6 +1195,10 @@ class FolderInfo(BaseModel):
     created_time: str
     folder_url: str
 
+def folder_info(folder):
+    return FolderInfo(folder_name=folder['name'], folder_id=folder['id'], created_time=folder['createdTime'],
+                      folder_url=f"https://drive.google.com/drive/folders/{folder['id']}").model_dump()
+
 # Route to search for folders
 @app.post("/search_folder_in_folder/", response_model=list[FolderInfo])
 async def search_folder_in_folder_endpoint(request_data: SearchFoldersRequest):
@@ -114,117 +1206,547 @@ async def search_folder_in_folder_endpoint(request_data: SearchFoldersRequest):
     ParentFolderId = request_data.parent_folder_id
     
     # Search for folders with keywords in their name
-    results = drive_service.files().list(q=f"name contains '{keywords}' and mimeType='application/vnd.google-apps.folder' and '{ParentFolderId}' in parents",
-                                         fields="files(id, name, createdTime)").execute()
-    
-    folders_info = []
-    for folder in results.get('files', []):
-        folder_name = folder['name']
-        folder_id = folder['id']
-        created_time = folder['createdTime']
-        folders_info.append(FolderInfo(folder_name=folder_name, folder_id=folder_id, created_time=created_time, folder_url=f"https://drive.google.com/drive/folders/{folder_id}"))
-    
-    return folders_info
-
+    response = await drive_listing_response(
+        f"name contains {drive_literal(keywords)} and mimeType='application/vnd.google-apps.folder' and '{ParentFolderId}' in parents",
+        "folder_listing", folder_info,
+        page_token=request_data.page_token, limit=request_data.limit, format=request_data.format,
+        mirror_filter={"parent_id": ParentFolderId, "mime_type": FOLDER_MIME_TYPE, "name_contains": keywords})
+    return response if response is not None else []
+
+
+def drive_file_info(item):
+    return {
+        "name": item['name'],
+        "id": item['id'],
+        "type": item['mimeType'],
+        "created": item['createdTime'],
+        "url" : item['webViewLink']
+    }
 
 # Function helpers for list all files and folders in Google Drive
-def list_files_in_drive():
+async def list_files_in_drive(page_token=None, limit=None, format="json"):
     try:
-        # List all files and folders in Google Drive
-        results = drive_service.files().list(
-            pageSize=1000,  # Adjust as needed for the number of files/folders you have
-            fields="files(id, name, mimeType,createdTime, webViewLink)"
-        ).execute()
-
-        files = results.get('files', [])
-
-        if not files:
+        # List all files and folders in Google Drive, page by page
+        response = await drive_listing_response(None, "drive_listing", drive_file_info,
+                                                page_token=page_token, limit=limit, format=format, mirror_filter={})
+        if response is None:
             return "No files or folders found in Google Drive."
-        else:
-            output = []
-            for item in files:
-                file_info = {
-                    "name": item['name'],
-                    "id": item['id'],
-                    "type": item['mimeType'],
-                    "created": item['createdTime'],
-                    "url" : item['webViewLink']
-                }
-                output.append(file_info)
-            return output
+        return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
     
 # Endpoint to list all files and folders in GG Drive
 @app.get("/list_drive_files", response_model=list[dict])
-def list_drive_files_endpoint():
-    return list_files_in_drive()
-
-# Function to list files in a folder_id and retrieve their details
-def list_files_in_folder(folder_id):
-    results = drive_service.files().list(q=f"'{folder_id}' in parents", fields='files(id, name, createdTime)').execute()
-    files = results.get('files', [])
-    return files
+async def list_drive_files_endpoint(page_token: Optional[str] = None, limit: Optional[int] = Query(None, ge=1),
+                                    format: Literal["json", "ndjson"] = "json"):
+    return await list_files_in_drive(page_token, limit, format)
 
 # Endpoint to list files in a specific folder_id
 @app.get("/list_files_in_folder/{folder_id}", response_model=List[dict])
-def list_files_in_folder_endpoint(folder_id: str):
-    files = list_files_in_folder(folder_id)
-    if not files:
+async def list_files_in_folder_endpoint(folder_id: str, page_token: Optional[str] = None, limit: Optional[int] = Query(None, ge=1),
+                                        format: Literal["json", "ndjson"] = "json"):
+    response = await drive_listing_response(f"'{folder_id}' in parents", "folder_listing", dict,
+                                            page_token=page_token, limit=limit, format=format,
+                                            cache_key=('folder_files', folder_id), mirror_filter={"parent_id": folder_id})
+    if response is None:
         raise HTTPException(status_code=404, detail="Folder not found or empty")
-    return files
-
-# Function to list files in a folder_id and retrieve their details
-def list_folders_in_folder(folder_id):
-    query = f"'{folder_id}' in parents and mimeType = 'application/vnd.google-apps.folder'"
-    results = drive_service.files().list(q=query, fields='files(id, name, createdTime)').execute()
-    files = results.get('files', [])
-    return files
+    return response
 
 # Endpoint to list files in a specific folder_id
 @app.get("/list_folders_in_folder/{folder_id}", response_model=List[dict])
-def list_files_in_folder_endpoint(folder_id: str):
-    files = list_folders_in_folder(folder_id)
-    if not files:
+async def list_files_in_folder_endpoint(folder_id: str, page_token: Optional[str] = None, limit: Optional[int] = Query(None, ge=1),
+                                        format: Literal["json", "ndjson"] = "json"):
+    query = f"'{folder_id}' in parents and mimeType = 'application/vnd.google-apps.folder'"
+    response = await drive_listing_response(query, "folder_listing", dict,
+                                            page_token=page_token, limit=limit, format=format,
+                                            cache_key=('folder_folders', folder_id),
+                                            mirror_filter={"parent_id": folder_id, "mime_type": FOLDER_MIME_TYPE})
+    if response is None:
         raise HTTPException(status_code=404, detail="Folder not found or empty")
-    return files
-
-
-# Function to find a file by its name and return its ID
-def find_file_in_folder_id_by_name(folder_id, file_name):
-    files = list_files_in_folder(folder_id)
-    for file in files:
-        if file['name'] == file_name:
-            return file['id']
+    return response
+
+
+# Quote a value as a Drive query string literal, escaping backslashes and single quotes
+def drive_literal(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+# Map of name -> id for the files in a folder; the first file wins when names repeat. Cached with
+# the folder's other metadata, so creating or copying into the folder drops it.
+async def folder_name_index(folder_id):
+    async def load():
+        files = await list_all_drive_files(f"{drive_literal(folder_id)} in parents and trashed = false", "folder_listing")
+        index = {}
+        for file in files:
+            index.setdefault(file['name'], file['id'])
+        return index
+    return await metadata_cache.get_or_load(('folder_names', folder_id), load)
+
+# Function to find a file by its name and return its ID. The exact-name match runs in Drive, so
+# only matching files come back; use_index answers repeated lookups from the folder's name index.
+async def find_file_in_folder_id_by_name(folder_id, file_name, use_index=False):
+    if use_index:
+        return (await folder_name_index(folder_id)).get(file_name)
+    query = f"{drive_literal(folder_id)} in parents and name = {drive_literal(file_name)} and trashed = false"
+    async for files, _ in iter_drive_pages(query, "file_lookup", prefetch=False):
+        if files:
+            return files[0]['id']
     return None
 
 # Pydantic model for finding a file by name request
 class SearchFileRequest(BaseModel):
     folder_id: str
     file_name: str
+    use_index: bool = False  # Look the name up in a cached name -> id index of the folder
 
 # Endpoint to find a file by name in a folder
 @app.post("/search_file_in_folder")
-def search_file_in_folder_endpoint(request_data: SearchFileRequest):
+async def search_file_in_folder_endpoint(request_data: SearchFileRequest):
     folder_id = request_data.folder_id
     file_name = request_data.file_name
-    file_id = find_file_in_folder_id_by_name(folder_id, file_name)
+    file_id = await find_file_in_folder_id_by_name(folder_id, file_name, request_data.use_index)
     if file_id:
         return {"message": f"File '{file_name}' found with ID: {file_id}"}
     else:
         raise HTTPException(status_code=404, detail=f"File '{file_name}' not found in the folder")
     
+# Folder tree walks: breadth-first, one Drive query per group of up to FOLDER_TREE_PARENTS_PER_QUERY
+# parents ("'a' in parents or 'b' in parents ..."), with at most FOLDER_TREE_CONCURRENCY queries in flight
+FOLDER_TREE_PARENTS_PER_QUERY = int(os.getenv("FOLDER_TREE_PARENTS_PER_QUERY", "20"))
+FOLDER_TREE_CONCURRENCY = int(os.getenv("FOLDER_TREE_CONCURRENCY", "4"))
+FOLDER_TREE_MAX_DEPTH = int(os.getenv("FOLDER_TREE_MAX_DEPTH", "10"))
+FOLDER_TREE_MAX_ITEMS = int(os.getenv("FOLDER_TREE_MAX_ITEMS", "10000"))
+
+# Drive query for the children of any of parents (folders only unless include_files)
+def folder_children_query(parents, include_files):
+    query = "(" + " or ".join(f"{drive_literal(parent)} in parents" for parent in parents) + ") and trashed = false"
+    if not include_files:
+        query += f" and mimeType = '{FOLDER_MIME_TYPE}'"
+    return query
+
+# Whether any of parents has a child the walk would list; asks Drive for a single item
+async def has_children(parents, include_files):
+    async for files, _ in iter_drive_pages(folder_children_query(parents, include_files), "file_lookup", limit=1, prefetch=False):
+        if files:
+            return True
+    return False
+
+# Yield every item below folder_id as {"id", "name", "mimeType", "createdTime", "parent_id", "depth"}
+# in the order the pages arrive, level by level. Ends with {"truncated": True} if a limit cut the walk short.
+async def walk_folder_tree(folder_id, max_depth, max_items, include_files=False):
+    semaphore = asyncio.Semaphore(FOLDER_TREE_CONCURRENCY)
+    seen = {folder_id}
+    emitted = 0
+    level = [folder_id]
+    depth = 1
+    while level:
+        chunks = [level[index:index + FOLDER_TREE_PARENTS_PER_QUERY] for index in range(0, len(level), FOLDER_TREE_PARENTS_PER_QUERY)]
+        if depth > max_depth:
+            # Only report a cut if the folders below the last level actually have children
+            async def probe(parents):
+                async with semaphore:
+                    return await has_children(parents, include_files)
+            if any(await asyncio.gather(*(probe(chunk) for chunk in chunks))):
+                yield {"truncated": True}
+            return
+        pages = asyncio.Queue()
+
+        async def list_children(parents):
+            try:
+                async with semaphore:
+                    async for files, _ in iter_drive_pages(folder_children_query(parents, include_files), "tree_listing", prefetch=False):
+                        await pages.put((set(parents), files))
+            except Exception as e:
+                await pages.put(e)
+            finally:
+                await pages.put(None)
+
+        tasks = [asyncio.ensure_future(list_children(chunk)) for chunk in chunks]
+        next_level = []
+        try:
+            remaining = len(tasks)
+            while remaining:
+                page = await pages.get()
+                if page is None:
+                    remaining -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                parents, files = page
+                for file in files:
+                    if file['id'] in seen:
+                        continue
+                    if emitted >= max_items:
+                        yield {"truncated": True}
+                        return
+                    seen.add(file['id'])
+                    emitted += 1
+                    parent_id = next((parent for parent in file.get('parents', []) if parent in parents), None)
+                    yield {"id": file['id'], "name": file['name'], "mimeType": file['mimeType'],
+                           "createdTime": file.get('createdTime'), "parent_id": parent_id, "depth": depth}
+                    if file['mimeType'] == FOLDER_MIME_TYPE:
+                        next_level.append(file['id'])
+        finally:
+            for task in tasks:
+                task.cancel()
+        level = next_level
+        depth += 1
+
+# Write tree items out as NDJSON, or as {"items": [...], "truncated": bool}
+async def stream_folder_tree(first_item, items, format):
+    async def all_items():
+        if first_item is not None:
+            yield first_item
+            async for item in items:
+                yield item
+
+    truncated = False
+    separator = ""
+    if format == "json":
+        yield '{"items": ['
+    async for item in all_items():
+        if "truncated" in item:
+            truncated = True
+            continue
+        if format == "json":
+            yield separator + json.dumps(item)
+            separator = ","
+        else:
+            yield json.dumps(item) + "\n"
+    if format == "json":
+        yield f'], "truncated": {json.dumps(truncated)}}}'
+    elif truncated:
+        yield json.dumps({"truncated": True}) + "\n"
+
+# Endpoint to list a folder hierarchy, streamed while it is being walked
+@app.get("/folder_tree/{folder_id}")
+async def folder_tree_endpoint(folder_id: str, max_depth: int = Query(FOLDER_TREE_MAX_DEPTH, ge=1),
+                               max_items: int = Query(FOLDER_TREE_MAX_ITEMS, ge=1), include_files: bool = False,
+                               format: Literal["json", "ndjson"] = "ndjson"):
+    items = walk_folder_tree(folder_id, max_depth, max_items, include_files)
+    try:
+        first_item = await items.__anext__()
+    except StopAsyncIteration:
+        first_item = None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    media_type = NDJSON_MEDIA_TYPE if format == "ndjson" else "application/json"
+    return StreamingResponse(stream_folder_tree(first_item, items, format), media_type=media_type)
+
+# Background jobs: slow operations return a job id at once and run on the event loop, at most
+# JOB_WORKERS at a time. Jobs live in the in-process store, or in SQLite (JOB_STORE=sqlite,
+# file JOB_STORE_PATH) so their state survives a worker restart.
+JOB_STORE = os.getenv("JOB_STORE", "memory")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "/tmp/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_TTL = float(os.getenv("JOB_TTL", "86400"))
+JOB_STORE_MAXSIZE = int(os.getenv("JOB_STORE_MAXSIZE", "10000"))
+
+# Every queued or running job is leased to the worker process that owns it; the owner renews the
+# lease while it holds the job. Jobs whose lease ran out belong to a worker that went away.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Jobs kept in memory, expiring JOB_TTL seconds after their last update
+class MemoryJobStore:
+    blocking = False
+
+    def __init__(self, maxsize, ttl):
+        self._jobs = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self, status=None, limit=100):
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if status is None or job["status"] == status]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)[:limit]
+
+    # Move a queued job we own to running; returns the updated job, or None if it is not ours to run
+    def claim(self, job_id, owner, lease_until):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued" or job["owner"] != owner:
+                return None
+            job = self._jobs[job_id] = {**job, "status": "running", "started_at": time.time(), "lease_until": lease_until}
+            return dict(job)
+
+    # Record a finished job, unless another worker took it over (or failed it) in the meantime
+    def finish(self, job):
+        with self._lock:
+            current = self._jobs.get(job["id"])
+            if current is None or current["status"] != "running" or current["owner"] != job["owner"]:
+                return False
+            self._jobs[job["id"]] = dict(job)
+            return True
+
+    def renew(self, owner, lease_until):
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["owner"] == owner and job["status"] in ("queued", "running"):
+                    self._jobs[job_id] = {**job, "lease_until": lease_until}
+
+    # Take over queued jobs whose owner's lease ran out and fail running ones; returns the adopted jobs
+    def recover_expired(self, owner, now, lease_until):
+        adopted = []
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["status"] not in ("queued", "running") or job["lease_until"] >= now:
+                    continue
+                if job["status"] == "running":
+                    self._jobs[job_id] = {**job, "status": "failed", "error": "Interrupted by a worker restart", "finished_at": now}
+                else:
+                    job = self._jobs[job_id] = {**job, "owner": owner, "lease_until": lease_until}
+                    adopted.append(dict(job))
+        return sorted(adopted, key=lambda job: job["created_at"])
+
+# Jobs kept in a SQLite file that several worker processes can share; params and results are
+# stored as JSON. Every state change is a conditional UPDATE, so only one worker wins it.
+class SqliteJobStore:
+    blocking = True
+    COLUMNS = ("id", "kind", "status", "params", "result", "error", "created_at", "started_at", "finished_at", "owner", "lease_until")
+
+    def __init__(self, path, ttl):
+        import sqlite3
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, params TEXT, "
+                         "result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL, owner TEXT, lease_until REAL)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, type in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {type}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.commit()
+
+    def _row(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["lease_until"] = job["lease_until"] or 0.0
+        return job
+
+    def _write(self, statement, args):
+        with self._lock:
+            cursor = self._db.execute(statement, args)
+            self._db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def add(self, job):
+        row = [job[column] for column in self.COLUMNS]
+        row[3] = json.dumps(job["params"])
+        self._write(f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(row))})", row)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def list(self, status=None, limit=100):
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        args = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            args = (status,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", args + (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def claim(self, job_id, owner, lease_until):
+        claimed = self._write("UPDATE jobs SET status = 'running', started_at = ?, lease_until = ? "
+                              "WHERE id = ? AND status = 'queued' AND owner = ?", (time.time(), lease_until, job_id, owner))
+        return self.get(job_id) if claimed else None
+
+    def finish(self, job):
+        result = json.dumps(job["result"]) if job["result"] is not None else None
+        return bool(self._write("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                                "WHERE id = ? AND status = 'running' AND owner = ?",
+                                (job["status"], result, job["error"], job["finished_at"], job["id"], job["owner"])))
+
+    def renew(self, owner, lease_until):
+        self._write("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN ('queued', 'running')", (lease_until, owner))
+
+    def recover_expired(self, owner, now, lease_until):
+        self._write("UPDATE jobs SET status = 'failed', error = 'Interrupted by a worker restart', finished_at = ? "
+                    "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)", (now, now))
+        candidates = self.list("queued", limit=JOB_STORE_MAXSIZE)
+        adopted = []
+        for job in sorted(candidates, key=lambda job: job["created_at"]):
+            if job["lease_until"] >= now:
+                continue
+            if self._write("UPDATE jobs SET owner = ?, lease_until = ? WHERE id = ? AND status = 'queued' "
+                           "AND (lease_until IS NULL OR lease_until < ?)", (owner, lease_until, job["id"], now)):
+                adopted.append({**job, "owner": owner, "lease_until": lease_until})
+        return adopted
+
+# Job kinds: the model that validates a job's params and the coroutine that runs it
+async def create_google_sheet_job(params):
+    url = await create_google_sheet(params.source_spreadsheet_id, params.new_spreadsheet_title,
+                                    params.permissions_email, params.folder_id)
+    return {"url": url}
+
+async def folder_tree_job(params):
+    items = [item async for item in walk_folder_tree(params.folder_id, params.max_depth, params.max_items, params.include_files)]
+    truncated = bool(items) and "truncated" in items[-1]
+    return {"items": items[:-1] if truncated else items, "truncated": truncated}
+
+async def provision_job(params):
+    validate_manifest(params)
+    return await provision(params)
+
+# Pydantic model for a background folder tree walk
+class FolderTreeJobRequest(BaseModel):
+    folder_id: str
+    max_depth: int = Field(FOLDER_TREE_MAX_DEPTH, ge=1)
+    max_items: int = Field(FOLDER_TREE_MAX_ITEMS, ge=1)
+    include_files: bool = False
+
+JOB_KINDS = {
+    "create_google_sheet": (CreateGoogleSheetRequest, create_google_sheet_job),
+    "folder_tree": (FolderTreeJobRequest, folder_tree_job),
+    "provision": (ProvisionRequest, provision_job),
+}
+
+# Runs submitted jobs and records every state change in the store. Each runner has its own
+# owner id; SQLite calls run off the event loop.
+class JobRunner:
+    def __init__(self, store, workers):
+        self.store = store
+        self.workers = workers
+        self.owner = uuid.uuid4().hex
+        self._semaphore = None
+        self._tasks = set()
+        self._heartbeat = None
+        self._recovered_at = None
+
+    async def _store(self, method, *args):
+        if not self.store.blocking:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def _schedule(self, job):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        task = asyncio.ensure_future(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.ensure_future(self._renew_leases())
+
+    # Keep our jobs' leases alive while any of them is queued or running here
+    async def _renew_leases(self):
+        while self._tasks:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await self._store(self.store.renew, self.owner, time.time() + JOB_LEASE_SECONDS)
+            except Exception:
+                # Retried on the next beat; the lease has room for a missed one
+                pass
+
+    async def submit(self, kind, params):
+        await self.recover()
+        job = {"id": uuid.uuid4().hex, "kind": kind, "status": "queued", "params": params.model_dump(),
+               "result": None, "error": None, "created_at": time.time(), "started_at": None, "finished_at": None,
+               "owner": self.owner, "lease_until": time.time() + JOB_LEASE_SECONDS}
+        await self._store(self.store.add, job)
+        self._schedule(job)
+        return job
+
+    async def _run(self, job):
+        # The task inherited the submitting request's context; its calls are not part of that response
+        request_timings.set(None)
+        model, handler = JOB_KINDS[job["kind"]]
+        async with self._semaphore:
+            # Another worker may have adopted the job while it waited for a slot
+            job = await self._store(self.store.claim, job["id"], self.owner, time.time() + JOB_LEASE_SECONDS)
+            if job is None:
+                return
+            try:
+                result = await handler(model.model_validate(job["params"]))
+                job = {**job, "status": "succeeded", "result": result}
+            except Exception as e:
+                job = {**job, "status": "failed", "error": e.detail if isinstance(e, HTTPException) else str(e)}
+            job["finished_at"] = time.time()
+            await self._store(self.store.finish, job)
+
+    # Pick up the jobs of workers that went away (their lease expired): queued jobs are adopted and
+    # run here; running ones are marked failed, since their Drive calls (copies, folder creation)
+    # may already have happened. Checked at most every half lease.
+    async def recover(self):
+        now = time.time()
+        if self._recovered_at is not None and now - self._recovered_at < JOB_LEASE_SECONDS / 2:
+            return
+        self._recovered_at = now
+        for job in await self._store(self.store.recover_expired, self.owner, now, now + JOB_LEASE_SECONDS):
+            if job["kind"] in JOB_KINDS:
+                self._schedule(job)
+
+    async def get(self, job_id):
+        await self.recover()
+        return await self._store(self.store.get, job_id)
+
+    async def list(self, status=None, limit=100):
+        await self.recover()
+        return await self._store(self.store.list, status, limit)
+
+    def stats(self):
+        return {"store": JOB_STORE, "workers": self.workers, "active": len(self._tasks)}
+
+job_runner = JobRunner(SqliteJobStore(JOB_STORE_PATH, JOB_TTL) if JOB_STORE == "sqlite" else MemoryJobStore(JOB_STORE_MAXSIZE, JOB_TTL), JOB_WORKERS)
+
+# Response for a newly submitted job
+def job_accepted(job):
+    return JSONResponse(status_code=202, content={"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"})
+
+# Pydantic model for submitting a job
+class JobRequest(BaseModel):
+    kind: Literal["create_google_sheet", "folder_tree", "provision", "share"]
+    params: dict
+
+# Endpoint to start a background job
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(request_data: JobRequest):
+    model, _ = JOB_KINDS[request_data.kind]
+    try:
+        params = model.model_validate(request_data.params)
+        if request_data.kind == "provision":
+            validate_manifest(params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job_accepted(await job_runner.submit(request_data.kind, params))
+
+# Endpoint to poll a job's status and result
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Endpoint to list recent jobs
+@app.get("/jobs")
+async def list_jobs_endpoint(status: Optional[Literal["queued", "running", "succeeded", "failed"]] = None,
+                             limit: int = Query(100, ge=1, le=1000)):
+    return await job_runner.list(status, limit)
+
 # Function helpers to search files with keywords in Google Drive
-def find_files_by_keyword(keyword):
+async def find_files_by_keyword(keyword):
     try:
         # List all files in Google Drive
-        results = drive_service.files().list(
-            q=f"name contains '{keyword}' and trashed=false",
-            fields="files(id, name, mimeType,createdTime, webViewLink)"
-        ).execute()
-
-        files = results.get('files', [])
+        files = await list_all_drive_files(
+            f"name contains {drive_literal(keyword)} and trashed=false",
+            "drive_listing"
+        )
 
         # Create a list of dictionaries containing file ID and name
         file_list = [{"id": file['id'], "name": file['name'], "created": file['createdTime'], "url":file['webViewLink']} for file in files]
@@ -236,8 +1758,8 @@ def find_files_by_keyword(keyword):
 
 # # Endpoint to search file from keyword
 # @app.get("/search_files", response_model=list[dict])
-# def find_files_by_keyword_endpoint(keyword: str = Query(..., description="Keyword to search for in file names")):
-#     file_list = find_files_by_keyword(keyword)
+# async def find_files_by_keyword_endpoint(keyword: str = Query(..., description="Keyword to search for in file names")):
+#     file_list = await find_files_by_keyword(keyword)
 
 #     if file_list:
 #         return file_list
@@ -267,7 +1789,8 @@ async def share_file_endpoint(request_data: ShareFileRequest):
     
     try:
         # Share the folder with the specified email address
-        drive_service.permissions().create(fileId=file_id, body=permission, sendNotificationEmails=False).execute()
+        await execute_async(masked(drive_service.permissions().create, "permission", fileId=file_id, body=permission, sendNotificationEmail=False))
+        metadata_cache.invalidate(file_id)
         return {"message": f"File {file_id} shared with {permission_email} as a {role}."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -295,7 +1818,8 @@ async def share_folder_endpoint(request_data: ShareFolderRequest):
     
     try:
         # Share the folder with the specified email address
-        drive_service.permissions().create(fileId=folder_id, body=permission, sendNotificationEmails=False).execute()
+        await execute_async(masked(drive_service.permissions().create, "permission", fileId=folder_id, body=permission, sendNotificationEmail=False))
+        metadata_cache.invalidate(folder_id)
         return {"message": f"Folder {folder_id} shared with {permission_email} as a {role}."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -307,6 +1831,17 @@ class UpdatePermissionRoleRequest(BaseModel):
     permission_email: str
     new_role: str
 
+# Function to list every permission on a file (id, email and role only)
+async def list_permissions(file_id):
+    permissions = []
+    page_token = None
+    while True:
+        response = await execute_async(masked(drive_service.permissions().list, "permission_lookup", fileId=file_id, pageToken=page_token))
+        permissions.extend(response.get('permissions', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return permissions
+
 # Endpoint for updating file access permission
 @app.post("/update_permission_role/")
 async def update_permission_role_endpoint(request_data: UpdatePermissionRoleRequest):
@@ -315,20 +1850,15 @@ async def update_permission_role_endpoint(request_data: UpdatePermissionRoleRequ
     new_role = request_data.new_role
     
     try:
-        # Get the current permissions for the file
-        permissions = drive_service.permissions().list(fileId=file_id).execute()
-        
-        # Find the permission with the specified email address
-        target_permission = None
-        for permission in permissions.get('permissions', []):
-            if permission['emailAddress'] == permission_email:
-                target_permission = permission
-                break
+        # Find the permission for the email in the file's cached email -> permission map
+        index = await permission_index(file_id)
+        target_permission = index.get(permission_email.lower())
         
         if target_permission:
-            # Update the role for the existing permission
+            # Update the role for the existing permission; only the role is sent
+            await execute_async(masked(drive_service.permissions().update, "permission", fileId=file_id, permissionId=target_permission['id'],
+                                       body={'role': new_role}))
             target_permission['role'] = new_role
-            drive_service.permissions().update(fileId=file_id, permissionId=target_permission['id'], body=target_permission, sendNotificationEmails=False).execute()
             return {"message": f"Permission role for {permission_email} on file {file_id} updated to {new_role}."}
         else:
              # Define the permission
@@ -339,24 +1869,204 @@ async def update_permission_role_endpoint(request_data: UpdatePermissionRoleRequ
                 'sendNotificationEmails': False
             }
             # Create a new permission with the requested role
-            drive_service.permissions().create(fileId=file_id, body=permission, sendNotificationEmails=False).execute()
+            await execute_async(masked(drive_service.permissions().create, "permission", fileId=file_id, body=permission, sendNotificationEmail=False))
+            metadata_cache.invalidate(file_id)
             return {"message": f"Created permission for {permission_email} on file {file_id} with role {new_role}."}
     except Exception as e:
+        # The cached map may be stale (e.g. the permission was removed elsewhere)
+        metadata_cache.invalidate(file_id)
         raise HTTPException(status_code=400, detail=str(e))
     
 
+# Drive accepts at most 100 calls per batch request
+DRIVE_BATCH_SIZE = int(os.getenv("DRIVE_BATCH_SIZE", "100"))
+DRIVE_BATCH_CONCURRENCY = int(os.getenv("DRIVE_BATCH_CONCURRENCY", "2"))
+
+# Run Drive calls {request_id: request} as batch requests of up to DRIVE_BATCH_SIZE calls.
+# Calls rejected for quota are sent again in a later batch with backoff. Returns
+# {request_id: (response, exception)}.
+async def execute_batch(requests):
+    results = {}
+    semaphore = asyncio.Semaphore(DRIVE_BATCH_CONCURRENCY)
+
+    async def run(chunk):
+        batch = drive_service.new_batch_http_request()
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id,
+                      callback=lambda request_id, response, exception: results.__setitem__(request_id, (response, exception)))
+        async with semaphore:
+            try:
+                await execute_async(batch)
+            except Exception as e:
+                for request_id, _ in chunk:
+                    results[request_id] = (None, e)
+
+    pending = list(requests.items())
+    attempt = 0
+    while pending:
+        await asyncio.gather(*(run(pending[index:index + DRIVE_BATCH_SIZE]) for index in range(0, len(pending), DRIVE_BATCH_SIZE)))
+        throttled = [(request_id, request) for request_id, request in pending if is_rate_limited(results[request_id][1])]
+        delays = [retry_delay(request, results[request_id][1], attempt) for request_id, request in throttled]
+        if not throttled or None in delays:
+            break
+        record_quota_stat("drive", "retries", len(throttled))
+        await asyncio.sleep(max(delays))
+        pending = throttled
+        attempt += 1
+    return results
+
+# Map of lower-cased email -> {"id", "role"} for a permission listing
+def permission_map(permissions):
+    return {permission['emailAddress'].lower(): {"id": permission['id'], "role": permission.get('role')}
+            for permission in permissions if permission.get('emailAddress')}
+
+# Email -> permission map of each file, from the metadata cache or one batched permissions().list
+# per 100 files. Files whose listing failed map to the exception instead.
+async def permission_indexes(file_ids):
+    indexes = {}
+    missing = []
+    for file_id in file_ids:
+        found, index = metadata_cache.lookup(('permissions', file_id))
+        if found:
+            indexes[file_id] = index
+        else:
+            missing.append(file_id)
+    if not missing:
+        return indexes
+    generation = metadata_cache.generation
+    responses = await execute_batch({file_id: masked(drive_service.permissions().list, "permission_lookup", fileId=file_id, pageSize=100)
+                                     for file_id in missing})
+    for file_id in missing:
+        response, exception = responses[file_id]
+        if exception is not None:
+            indexes[file_id] = exception
+            continue
+        permissions = response.get('permissions', [])
+        if response.get('nextPageToken'):
+            permissions = await list_permissions(file_id)
+        indexes[file_id] = permission_map(permissions)
+        metadata_cache.store(('permissions', file_id), indexes[file_id], generation)
+    return indexes
+
+# Email -> permission map for one file
+async def permission_index(file_id):
+    index = (await permission_indexes([file_id]))[file_id]
+    if isinstance(index, Exception):
+        raise index
+    return index
+
+# Pydantic model for sharing many files with many users
+class BulkShareRequest(BaseModel):
+    file_ids: List[str]
+    emails: List[str]
+    role: str
+    send_notification_email: bool = False
+    background: bool = False  # Return a job id at once and share in the background (poll /jobs/{job_id})
+
+# Give every email the role on every file: existing permissions are updated, missing ones created,
+# all in batch requests. Returns one result per file and email.
+async def bulk_share(file_ids, emails, role, send_notification_email=False):
+    file_ids = list(dict.fromkeys(file_ids))
+    emails = list(dict.fromkeys(email.lower() for email in emails))
+    indexes = await permission_indexes(file_ids)
+    items = []
+    requests = {}
+    for file_id in file_ids:
+        for email in emails:
+            item = {"file_id": file_id, "email": email}
+            items.append(item)
+            index = indexes[file_id]
+            if isinstance(index, Exception):
+                item.update(action="none", status="failed", error=str(index))
+                continue
+            existing = index.get(email)
+            if existing is not None and existing["role"] == role:
+                item.update(action="unchanged", status="ok", permission_id=existing["id"])
+                continue
+            request_id = str(len(requests))
+            if existing is not None:
+                item.update(action="updated", permission_id=existing["id"])
+                requests[request_id] = masked(drive_service.permissions().update, "permission", fileId=file_id,
+                                              permissionId=existing["id"], body={'role': role})
+            else:
+                item["action"] = "created"
+                requests[request_id] = masked(drive_service.permissions().create, "permission", fileId=file_id,
+                                              body={'type': 'user', 'role': role, 'emailAddress': email},
+                                              sendNotificationEmail=send_notification_email)
+            item["request_id"] = request_id
+
+    responses = await execute_batch(requests)
+    failed_files = set()
+    for item in items:
+        request_id = item.pop("request_id", None)
+        if request_id is None:
+            continue
+        response, exception = responses[request_id]
+        if exception is not None:
+            item.update(status="failed", error=str(exception))
+            failed_files.add(item["file_id"])
+            continue
+        permission_id = response.get('id', item.get("permission_id"))
+        item.update(status="ok", permission_id=permission_id)
+        # Keep the cached map current so the next bulk call needs no listing
+        indexes[item["file_id"]][item["email"]] = {"id": permission_id, "role": role}
+    for file_id in failed_files:
+        metadata_cache.invalidate(file_id)
+    counts = {status: sum(1 for item in items if item["status"] == status) for status in ("ok", "failed")}
+    return {"results": items, **counts}
+
+async def bulk_share_job(params):
+    return await bulk_share(params.file_ids, params.emails, params.role, params.send_notification_email)
+
+JOB_KINDS["share"] = (BulkShareRequest, bulk_share_job)
+
+# Endpoint to share many files with many users
+@app.post("/share_bulk")
+async def share_bulk_endpoint(request_data: BulkShareRequest):
+    if not request_data.file_ids or not request_data.emails:
+        raise HTTPException(status_code=400, detail="file_ids and emails must not be empty")
+    if request_data.background:
+        return job_accepted(await job_runner.submit("share", request_data))
+    return await bulk_share(request_data.file_ids, request_data.emails, request_data.role, request_data.send_notification_email)
+
+# A1 notation helpers; rows are 1-based and column indexes 0-based
+A1_COLUMN = re.compile(r"^[A-Za-z]{1,3}$")
+
+def column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+def column_letters(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+# Quote a sheet title so names with spaces or punctuation are valid in a range
+def a1_range(sheet_name, cells=None):
+    quoted = "'" + sheet_name.replace("'", "''") + "'"
+    return f"{quoted}!{cells}" if cells else quoted
+
 # Pydantic model for get sheet name in spreadsheet request
 class GetSheetNamesRequest(BaseModel):
     spreadsheet_id: str
 
 @app.post("/get_sheet_names")
-def get_sheet_names_endpoint(request_body: GetSheetNamesRequest):
+async def get_sheet_names_endpoint(request_body: GetSheetNamesRequest):
     spreadsheet_id = request_body.spreadsheet_id
     try:
         # Get a list of sheet names in the spreadsheet
-        spreadsheet_metadata = spreadsheet_service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheets = spreadsheet_metadata.get('sheets', [])
-        sheet_names = [sheet['properties']['title'] for sheet in sheets]
+        async def load_sheet_names():
+            spreadsheet_metadata = await execute_async(masked(spreadsheet_service.spreadsheets().get, "sheet_names", spreadsheetId=spreadsheet_id),
+                                                       coalesce=True, resource_id=spreadsheet_id)
+            sheets = spreadsheet_metadata.get('sheets', [])
+            return [sheet['properties']['title'] for sheet in sheets]
+
+        sheet_names = await metadata_cache.get_or_load(('sheet_names', spreadsheet_id), load_sheet_names)
         return sheet_names
     except Exception as e:
         return {"error": str(e)}
@@ -367,7 +2077,7 @@ class AddNewSheetRequest(BaseModel):
     sheet_name: str
 
 @app.post("/add_new_sheet")
-def add_new_sheet(request_body: AddNewSheetRequest):
+async def add_new_sheet(request_body: AddNewSheetRequest):
     spreadsheet_id = request_body.spreadsheet_id
     sheet_name = request_body.sheet_name
 
@@ -384,32 +2094,277 @@ def add_new_sheet(request_body: AddNewSheetRequest):
     }
 
     try:
-        spreadsheet_service.spreadsheets().batchUpdate(
+        await execute_async(masked(
+            spreadsheet_service.spreadsheets().batchUpdate, "spreadsheet_update",
             spreadsheetId=spreadsheet_id, 
             body=batch_update_spreadsheet_request_body
-        ).execute()
+        ))
+        metadata_cache.invalidate(spreadsheet_id)
 
         return {"message": f"Sheet '{sheet_name}' added successfully."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
+# Rows per values().get when a read is streamed in chunks
+READ_CHUNK_ROWS = int(os.getenv("READ_CHUNK_ROWS", "5000"))
+A1_WINDOW = re.compile(r"^([A-Za-z]{1,3})?(\d+)?(?::([A-Za-z]{1,3})?(\d+)?)?$")
+
 # Pydantic model for get sheet rows data in spreadsheet request
 class ReadWorksheetDataRequest(BaseModel):
     spreadsheet_id: str
     sheet_name: str
+    range: Optional[str] = None  # A1 cells inside the sheet, e.g. "A1:F500", "B:D" or "10:200"
+    offset: int = Field(0, ge=0)  # Rows to skip from the start of the range
+    limit: Optional[int] = Field(None, ge=1)  # Maximum number of rows to return
+    columns: Optional[List[str]] = None  # Column letters to return, in this order
+    # "rows" is the row-keyed dict; ndjson, csv and compact stream; arrow and parquet need pyarrow
+    format: Literal["rows", "ndjson", "csv", "compact", "arrow", "parquet"] = "rows"
+    # Defaults to FORMATTED_VALUE for "rows" and to typed UNFORMATTED_VALUE for every other format
+    value_render_option: Optional[Literal["FORMATTED_VALUE", "UNFORMATTED_VALUE", "FORMULA"]] = None
+    header_row: Optional[int] = Field(1, ge=1)  # Row holding column names for compact/arrow/parquet
+
+# Work out the rows and columns a read covers: (first_row, last_row, first_column, last_column, selected).
+# Rows are 1-based, last_row None means "to the end of the sheet", columns are 0-based indexes
+# (None for whole rows), and selected lists the wanted columns relative to first_column.
+# A header_row that opens the range is not data, so it is skipped before offset and limit apply.
+def resolve_row_window(request_body, header_row=None):
+    first_row, last_row, first_column, last_column = 1, None, None, None
+    if request_body.range:
+        match = A1_WINDOW.match(request_body.range.replace("$", ""))
+        if not match or not any(match.groups()):
+            raise ValueError(f"Invalid range '{request_body.range}'")
+        start_column, start_row, end_column, end_row = match.groups()
+        if ":" not in request_body.range:
+            end_column, end_row = start_column, start_row
+        if bool(start_column) != bool(end_column):
+            raise ValueError(f"Invalid range '{request_body.range}'")
+        if start_column:
+            first_column, last_column = sorted((column_index(start_column), column_index(end_column)))
+        if start_row:
+            first_row = int(start_row)
+        if end_row:
+            last_row = int(end_row)
+
+    if header_row is not None and header_row == first_row:
+        first_row += 1
+    first_row += request_body.offset
+    if request_body.limit is not None:
+        window_end = first_row + request_body.limit - 1
+        last_row = window_end if last_row is None else min(last_row, window_end)
+
+    selected = None
+    if request_body.columns:
+        if not all(A1_COLUMN.match(column) for column in request_body.columns):
+            raise ValueError("Columns must be given as letters, e.g. ['A', 'C']")
+        indexes = [column_index(column) for column in request_body.columns]
+        if first_column is not None and (min(indexes) < first_column or max(indexes) > last_column):
+            raise ValueError("Columns must lie inside the requested range")
+        first_column, last_column = min(indexes), max(indexes)
+        selected = [index - first_column for index in indexes]
+    return first_row, last_row, first_column, last_column, selected
+
+def window_cells(first_row, last_row, first_column, last_column):
+    if first_column is None:
+        return f"{first_row}:{last_row}"
+    return f"{column_letters(first_column)}{first_row}:{column_letters(last_column)}{last_row or ''}"
+
+def project_row(row, selected):
+    if selected is None:
+        return row
+    return [row[index] if index < len(row) else "" for index in selected]
+
+# Number of rows in a sheet's grid, always fetched fresh since appends grow it
+async def sheet_row_count(spreadsheet_id, sheet_name):
+    response = await execute_async(masked(spreadsheet_service.spreadsheets().get, "sheet_grid",
+                                          spreadsheetId=spreadsheet_id, ranges=[a1_range(sheet_name)]))
+    sheets = response.get('sheets', [])
+    if not sheets:
+        raise ValueError(f"Sheet '{sheet_name}' not found")
+    return sheets[0]['properties']['gridProperties']['rowCount']
+
+# values().get for one range. Anything but FORMATTED_VALUE returns numbers and booleans typed;
+# dates and times still come back as readable strings.
+def values_get_request(spreadsheet_id, range_name, value_render_option="FORMATTED_VALUE"):
+    kwargs = {}
+    if value_render_option != "FORMATTED_VALUE":
+        kwargs = {"valueRenderOption": value_render_option, "dateTimeRenderOption": "FORMATTED_STRING"}
+    return masked(spreadsheet_service.spreadsheets().values().get, "values", spreadsheetId=spreadsheet_id, range=range_name, **kwargs)
+
+# Read a window of rows with one values().get; returns (first_row, values)
+async def read_row_window(spreadsheet_id, sheet_name, window, value_render_option="FORMATTED_VALUE", coalesce=False):
+    first_row, last_row, first_column, last_column, _ = window
+    if last_row is not None and last_row < first_row:
+        return first_row, []
+    if first_row == 1 and last_row is None and first_column is None:
+        range_name = a1_range(sheet_name)
+    else:
+        if last_row is None and first_column is None:
+            last_row = await sheet_row_count(spreadsheet_id, sheet_name)
+        range_name = a1_range(sheet_name, window_cells(first_row, last_row, first_column, last_column))
+    result = await execute_async(values_get_request(spreadsheet_id, range_name, value_render_option),
+                                 coalesce=coalesce, resource_id=spreadsheet_id)
+    return first_row, result.get('values', [])
+
+# Read a window of rows in chunks of READ_CHUNK_ROWS, yielding (first_row, values) per chunk.
+# The next chunk is requested while the current one is being written out.
+async def iter_row_chunks(spreadsheet_id, sheet_name, window, value_render_option="FORMATTED_VALUE", chunk_rows=None, coalesce=False):
+    first_row, last_row, first_column, last_column, _ = window
+    chunk_rows = chunk_rows or READ_CHUNK_ROWS
+    if last_row is None:
+        last_row = await sheet_row_count(spreadsheet_id, sheet_name)
+
+    def fetch(start):
+        end = min(start + chunk_rows - 1, last_row)
+        range_name = a1_range(sheet_name, window_cells(start, end, first_column, last_column))
+        return asyncio.ensure_future(execute_async(values_get_request(spreadsheet_id, range_name, value_render_option),
+                                                   coalesce=coalesce, resource_id=spreadsheet_id))
+
+    start = first_row
+    pending = fetch(start) if start <= last_row else None
+    try:
+        while pending is not None:
+            result = await pending
+            next_start = start + chunk_rows
+            pending = fetch(next_start) if next_start <= last_row else None
+            yield start, result.get('values', [])
+            start = next_start
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+# Column names for header-based formats: the header row's values, falling back to the column
+# letter for blank or repeated names
+def column_names(header, first_column, width, selected):
+    if selected is not None:
+        letters = [column_letters((first_column or 0) + index) for index in selected]
+    else:
+        letters = [column_letters((first_column or 0) + index) for index in range(width)]
+    names = []
+    for index, letter in enumerate(letters):
+        name = str(header[index]) if header is not None and index < len(header) and header[index] != "" else letter
+        names.append(name if name not in names else f"{name}_{letter}")
+    return names
+
+# Encode one chunk of rows for a streamed format
+def encode_row_chunk(format, start, values, selected):
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(project_row(row, selected) for row in values)
+        return buffer.getvalue()
+    if format == "compact":
+        return json.dumps([project_row(row, selected) for row in values])[1:-1]
+    return "".join(json.dumps({"row": start + index, "values": project_row(row, selected)}) + "\n"
+                   for index, row in enumerate(values))
+
+# Write streamed chunks out as NDJSON ({"row": n, "values": [...]}), CSV, or compact JSON
+# ({"header": [...], "rows": [[...], ...]}), one chunk at a time
+async def stream_row_chunks(first_chunk, chunks, selected, format, header=None):
+    async def all_chunks():
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    if format == "compact":
+        yield '{"header": ' + json.dumps(header) + ', "rows": ['
+    separator = ""
+    async for start, values in all_chunks():
+        if not values:
+            continue
+        chunk = encode_row_chunk(format, start, values, selected)
+        if format == "compact":
+            chunk = separator + chunk
+            separator = ","
+        yield chunk
+    if format == "compact":
+        yield "]}"
+
+# Infer one Arrow type per column: bool, int64, float64, or string for anything mixed
+def typed_column(values):
+    import pyarrow as pa
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present):
+        return pa.array(values, type=pa.bool_())
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return pa.array(values, type=pa.int64())
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return pa.array([None if value is None else float(value) for value in values], type=pa.float64())
+    return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+# Encode rows as an Arrow IPC stream or a Parquet file; blank cells become nulls
+def encode_columnar(format, names, rows):
+    import pyarrow as pa
+    width = max([len(names)] + [len(row) for row in rows])
+    names = names + [column_letters(index) for index in range(len(names), width)]
+    columns = [[] for _ in range(width)]
+    for row in rows:
+        for index, column in enumerate(columns):
+            value = row[index] if index < len(row) else None
+            column.append(None if value == "" else value)
+    table = pa.table([typed_column(column) for column in columns], names=names)
+    sink = io.BytesIO()
+    if format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+COLUMNAR_MEDIA_TYPES = {"arrow": "application/vnd.apache.arrow.stream", "parquet": "application/vnd.apache.parquet"}
+STREAM_MEDIA_TYPES = {"csv": "text/csv", "ndjson": NDJSON_MEDIA_TYPE, "compact": "application/json"}
 
 @app.post("/read_worksheet_rows")
-def read_worksheet_row_endpoint(request_body: ReadWorksheetDataRequest):
+async def read_worksheet_row_endpoint(request_body: ReadWorksheetDataRequest):
     spreadsheet_id = request_body.spreadsheet_id
     sheet_name = request_body.sheet_name
+    format = request_body.format
+    header_based = format in ("compact", "arrow", "parquet") and request_body.header_row is not None
+    try:
+        window = resolve_row_window(request_body, request_body.header_row if header_based else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected = window[4]
+    value_render_option = request_body.value_render_option or ("FORMATTED_VALUE" if format == "rows" else "UNFORMATTED_VALUE")
+    if format in COLUMNAR_MEDIA_TYPES:
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(status_code=501, detail=f"The '{format}' format needs the optional pyarrow package")
     try:
+        # Header-based formats take column names from header_row (already left out of the window)
+        header = None
+        if header_based:
+            first_column, last_column = window[2], window[3]
+            _, header_values = await read_row_window(spreadsheet_id, sheet_name,
+                                                     (request_body.header_row, request_body.header_row, first_column, last_column, selected),
+                                                     value_render_option, coalesce=True)
+            header = project_row(header_values[0], selected) if header_values else []
+
+        if format in COLUMNAR_MEDIA_TYPES:
+            rows = []
+            async for _, values in iter_row_chunks(spreadsheet_id, sheet_name, window, value_render_option, coalesce=True):
+                rows.extend(project_row(row, selected) for row in values)
+            names = column_names(header, window[2], max([len(header or [])] + [len(row) for row in rows]), selected)
+            # Encoding a large sheet takes long enough to stall every other request, so it runs in a thread
+            content = await asyncio.to_thread(encode_columnar, format, names, rows)
+            return Response(content=content, media_type=COLUMNAR_MEDIA_TYPES[format])
+
+        if format != "rows":
+            # Stream the sheet chunk by chunk without building the whole result in memory
+            chunks = iter_row_chunks(spreadsheet_id, sheet_name, window, value_render_option, coalesce=True)
+            try:
+                first_chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                first_chunk = (window[0], [])
+            if format == "compact":
+                first_column, last_column = window[2], window[3]
+                width = last_column - first_column + 1 if first_column is not None and last_column is not None else 0
+                header = column_names(header, first_column, max(width, len(header or [])), selected)
+            return StreamingResponse(stream_row_chunks(first_chunk, chunks, selected, format, header), media_type=STREAM_MEDIA_TYPES[format])
+
         # Read data from the specified sheet
-        range_name = f"{sheet_name}"
-        result = spreadsheet_service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
+        first_row, values = await read_row_window(spreadsheet_id, sheet_name, window, value_render_option, coalesce=True)
         rows = {}
         for row, value in enumerate(values):
-            rows[f'{row+1}'] = value
+            rows[f'{first_row + row}'] = project_row(value, selected)
         if not values:
             return {"message": f"No data found in '{sheet_name}'."}
         else:
@@ -419,10 +2374,197 @@ def read_worksheet_row_endpoint(request_body: ReadWorksheetDataRequest):
     
 
 
-# Pydantic model for update content plan ro
-class ContentPlanRowData(BaseModel):
+# Worksheet snapshots for /query_worksheet: the whole sheet is read once (typed values) and kept
+# for WORKSHEET_SNAPSHOT_TTL seconds, or until one of our write endpoints touches the spreadsheet
+WORKSHEET_SNAPSHOT_TTL = float(os.getenv("WORKSHEET_SNAPSHOT_TTL", "60"))
+WORKSHEET_SNAPSHOT_MAXSIZE = int(os.getenv("WORKSHEET_SNAPSHOT_MAXSIZE", "32"))
+NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+worksheet_snapshots = MetadataCache(WORKSHEET_SNAPSHOT_MAXSIZE, WORKSHEET_SNAPSHOT_TTL)
+
+# Numeric value of a cell or query bound, or None; numeric-looking strings count as numbers
+def numeric_value(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and NUMBER.match(value.strip()):
+        return float(value)
+    return None
+
+# Key used for equality: 12, 12.0 and "12" all match, booleans match TRUE/FALSE
+def equality_key(value):
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    number = numeric_value(value)
+    if number is not None:
+        return str(int(number)) if number.is_integer() else repr(number)
+    return str(value)
+
+# Rows of one worksheet with hash and sorted indexes, built the first time a column is queried
+class WorksheetSnapshot:
+    def __init__(self, header_row, header, values):
+        self.first_row = header_row + 1
+        self.rows = values
+        width = max([len(header)] + [len(row) for row in values])
+        self.names = column_names(header, 0, width, None)
+        self.loaded_at = time.monotonic()
+        self._hash = {}
+        self._sorted = {}
+
+    # Resolve a header name or a column letter to a column index
+    def column(self, name):
+        if name in self.names:
+            return self.names.index(name)
+        if A1_COLUMN.match(name):
+            return column_index(name)
+        raise ValueError(f"Unknown column '{name}'")
+
+    def cell(self, position, column):
+        row = self.rows[position]
+        return row[column] if column < len(row) else ""
+
+    # {equality_key: [positions]}
+    def hash_index(self, column):
+        index = self._hash.get(column)
+        if index is None:
+            index = {}
+            for position in range(len(self.rows)):
+                index.setdefault(equality_key(self.cell(position, column)), []).append(position)
+            self._hash[column] = index
+        return index
+
+    # Numbers and strings are sorted separately: ([numbers], [positions], [strings], [positions])
+    def sorted_index(self, column):
+        index = self._sorted.get(column)
+        if index is None:
+            numbers, strings = [], []
+            for position in range(len(self.rows)):
+                value = self.cell(position, column)
+                number = numeric_value(value)
+                if number is not None:
+                    numbers.append((number, position))
+                elif value != "":
+                    strings.append((str(value), position))
+            numbers.sort()
+            strings.sort()
+            index = self._sorted[column] = ([key for key, _ in numbers], [position for _, position in numbers],
+                                            [key for key, _ in strings], [position for _, position in strings])
+        return index
+
+    # Positions of the rows matching one predicate
+    def match(self, predicate):
+        column = self.column(predicate.column)
+        if predicate.op == "eq":
+            return set(self.hash_index(column).get(equality_key(predicate.value), []))
+        if predicate.op == "in":
+            index = self.hash_index(column)
+            return {position for value in predicate.value for position in index.get(equality_key(value), [])}
+        if predicate.op == "contains":
+            needle = str(predicate.value).lower()
+            return {position for key, positions in self.hash_index(column).items() if needle in key.lower() for position in positions}
+        low, high = predicate.bounds()
+        probe = low if low is not None else high
+        numbers, number_positions, strings, string_positions = self.sorted_index(column)
+        if numeric_value(probe) is not None:
+            keys, positions, convert = numbers, number_positions, numeric_value
+        else:
+            keys, positions, convert = strings, string_positions, str
+        start, end = 0, len(keys)
+        if low is not None:
+            start = (bisect.bisect_left if predicate.includes_low() else bisect.bisect_right)(keys, convert(low))
+        if high is not None:
+            end = (bisect.bisect_right if predicate.includes_high() else bisect.bisect_left)(keys, convert(high))
+        return set(positions[start:end])
+
+    def age(self):
+        return time.monotonic() - self.loaded_at
+
+# Read the whole sheet with typed values and build its snapshot
+async def load_worksheet_snapshot(spreadsheet_id, sheet_name, header_row):
+    result = await execute_async(values_get_request(spreadsheet_id, a1_range(sheet_name), "UNFORMATTED_VALUE"))
+    values = result.get('values', [])
+    header = values[header_row - 1] if len(values) >= header_row else []
+    return WorksheetSnapshot(header_row, header, values[header_row:])
+
+# Pydantic model for one query predicate; predicates in a query are ANDed
+class WorksheetPredicate(BaseModel):
+    column: str  # Header name or column letter
+    op: Literal["eq", "in", "contains", "gt", "gte", "lt", "lte", "between"] = "eq"
+    # A single value, a list for "in", or [low, high] (inclusive) for "between"
+    value: Union[bool, int, float, str, List[Union[bool, int, float, str]]]
+
+    def bounds(self):
+        if self.op == "between":
+            return self.value[0], self.value[1]
+        return (self.value, None) if self.op in ("gt", "gte") else (None, self.value)
+
+    def includes_low(self):
+        return self.op != "gt"
+
+    def includes_high(self):
+        return self.op != "lt"
+
+    def validate_value(self):
+        if self.op == "in" and not isinstance(self.value, list):
+            raise ValueError(f"'in' on column '{self.column}' needs a list of values")
+        if self.op == "between" and (not isinstance(self.value, list) or len(self.value) != 2):
+            raise ValueError(f"'between' on column '{self.column}' needs [low, high]")
+        if self.op not in ("in", "between") and isinstance(self.value, list):
+            raise ValueError(f"'{self.op}' on column '{self.column}' needs a single value")
+
+# Pydantic model for querying worksheet rows
+class QueryWorksheetRequest(BaseModel):
     spreadsheet_id: str
     sheet_name: str
+    where: List[WorksheetPredicate] = []
+    columns: Optional[List[str]] = None  # Header names or column letters to return, in this order
+    limit: Optional[int] = Field(None, ge=1)
+    header_row: int = Field(1, ge=1)  # Row holding the column names; data starts on the next row
+    refresh: bool = False  # Reload the snapshot instead of answering from cache
+
+# Endpoint to find rows by column values without reading the sheet on every call
+@app.post("/query_worksheet")
+async def query_worksheet_endpoint(request_body: QueryWorksheetRequest):
+    spreadsheet_id = request_body.spreadsheet_id
+    sheet_name = request_body.sheet_name
+    key = ('worksheet', spreadsheet_id, sheet_name, request_body.header_row)
+    try:
+        for predicate in request_body.where:
+            predicate.validate_value()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        load = lambda: load_worksheet_snapshot(spreadsheet_id, sheet_name, request_body.header_row)
+        if request_body.refresh:
+            generation = worksheet_snapshots.generation
+            snapshot = await load()
+            worksheet_snapshots.store(key, snapshot, generation)
+        else:
+            snapshot = await worksheet_snapshots.get_or_load(key, load)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        matches = None
+        # Evaluate the most selective predicates first so the intersection shrinks quickly
+        for positions in sorted((snapshot.match(predicate) for predicate in request_body.where), key=len):
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                break
+        selected = [snapshot.column(name) for name in request_body.columns] if request_body.columns else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    positions = sorted(matches) if matches is not None else range(len(snapshot.rows))
+    names = [snapshot.names[index] if index < len(snapshot.names) else column_letters(index) for index in selected] if selected else snapshot.names
+    rows = {}
+    for position in positions[:request_body.limit] if request_body.limit else positions:
+        rows[f'{snapshot.first_row + position}'] = project_row(snapshot.rows[position], selected)
+    return {"header": names, "rows": rows, "matched": len(positions), "snapshot_age_seconds": round(snapshot.age(), 3)}
+
+# Pydantic model for one content plan row (columns B to J)
+class ContentPlanRow(BaseModel):
     video_number: str
     content_pillar: str
     video_title: str
@@ -433,17 +2575,53 @@ class ContentPlanRowData(BaseModel):
     hashtags: str
     cta: str
 
-# Function to find the first empty row in columns C to G starting from row 6
-def find_empty_row_for_content_plan(spreadsheet_id, sheet_name):
-    values = spreadsheet_service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=f"{sheet_name}!B2:J").execute()
+# Pydantic model for update content plan ro
+class ContentPlanRowData(ContentPlanRow):
+    spreadsheet_id: str
+    sheet_name: str
+    # "fill_gap" reuses the first blank row in B2:J; "append" adds the row after the table in one atomic request
+    mode: Literal["fill_gap", "append"] = "fill_gap"
+
+# Pydantic model for adding many content plan rows at once
+class ContentPlanRowsData(BaseModel):
+    spreadsheet_id: str
+    sheet_name: str
+    rows: List[ContentPlanRow]
+
+CONTENT_PLAN_RANGE = "B2:J"
+A1_ROW = re.compile(r"![A-Z]+(\d+)")
+
+def content_plan_values(row):
+    return [row.video_number, row.content_pillar, row.video_title, row.video_summary, row.keywords, row.video_description, row.tags, row.hashtags, row.cta]
+
+# Fill-gap appends read then write, so appends to the same sheet from this process take turns. An
+# entry lives only while a request holds or waits on its lock, so the map stays as small as the
+# set of sheets being written.
+content_plan_locks = weakref.WeakValueDictionary()
+
+# Function to find the first empty row in columns B to J starting from row 2, or the row after the data
+async def find_empty_row_for_content_plan(spreadsheet_id, sheet_name):
+    values = await execute_async(masked(spreadsheet_service.spreadsheets().values().get, "values", spreadsheetId=spreadsheet_id, range=a1_range(sheet_name, CONTENT_PLAN_RANGE)))
     data = values.get("values", [])
-    if data:
-        for i, row in enumerate(data):
-            if all(cell == "" for cell in row):
-                return i + 2  # Return the row number (2-based index)
-    else:
-        return 2
-    return None
+    for i, row in enumerate(data):
+        if all(cell == "" for cell in row):
+            return i + 2  # Return the row number (2-based index)
+    return len(data) + 2
+
+# Append rows after the content plan table with a single values().append. Google applies appends
+# one at a time and INSERT_ROWS never overwrites existing cells, so concurrent writers cannot
+# collide. Returns the first row written.
+async def append_content_plan_rows(spreadsheet_id, sheet_name, rows):
+    response = await execute_async(masked(
+        spreadsheet_service.spreadsheets().values().append, "values_append",
+        spreadsheetId=spreadsheet_id,
+        range=a1_range(sheet_name, CONTENT_PLAN_RANGE),
+        valueInputOption="USER_ENTERED",
+        insertDataOption="INSERT_ROWS",
+        body={"values": rows}
+    ))
+    match = A1_ROW.search(response.get("updates", {}).get("updatedRange", ""))
+    return int(match.group(1)) if match else None
 
 # Endpoint for adding new content plan row
 @app.post("/add_content_plan_row/")
@@ -453,37 +2631,53 @@ async def add_content_plan_row_endpoint(request_body: ContentPlanRowData):
     sheet_name = request_body.sheet_name # Replace with your Google Sheet ID
 
     # Prepare the data for the new row
-    new_row_data = [[request_body.video_number, request_body.content_pillar, request_body.video_title, request_body.video_summary, request_body.keywords ,request_body.video_description, request_body.tags, request_body.hashtags, request_body.cta]]
+    new_row_data = [content_plan_values(request_body)]
 
     try:
-        # Find the first empty row in columns B to J starting from row 2
-        empty_row = find_empty_row_for_content_plan(spreadsheet_id,sheet_name)
-
-        if empty_row is not None:
-            # If an empty row is found, update it
-            range_name = f"{sheet_name}!B{empty_row}:J{empty_row}"
-        else:
-            # If no empty row is found, add a new row
-            empty_row = len(spreadsheet_service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=sheet_name).execute().get("values", [])) + 1
-            range_name = f"{sheet_name}!B{empty_row}:J{empty_row}"
-
-        # Prepare the request body to add a new row or update the existing row
-        request_body = {
-            "values": new_row_data
-        }
+        if request_body.mode == "append":
+            empty_row = await append_content_plan_rows(spreadsheet_id, sheet_name, new_row_data)
+            worksheet_snapshots.invalidate(spreadsheet_id)
+            return {"message": f"Row {empty_row} updated/added successfully."}
+
+        lock = content_plan_locks.setdefault((spreadsheet_id, sheet_name), asyncio.Lock())
+        async with lock:
+            # Find the first empty row in columns B to J starting from row 2
+            empty_row = await find_empty_row_for_content_plan(spreadsheet_id,sheet_name)
+            range_name = a1_range(sheet_name, f"B{empty_row}:J{empty_row}")
+
+            # Prepare the request body to add a new row or update the existing row
+            request_body = {
+                "values": new_row_data
+            }
 
-        # Make the API request to update or add the row
-        response = spreadsheet_service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=range_name,
-            valueInputOption="USER_ENTERED",
-            body=request_body
-        ).execute()
+            # Make the API request to update or add the row
+            response = await execute_async(masked(
+                spreadsheet_service.spreadsheets().values().update, "values_update",
+                spreadsheetId=spreadsheet_id,
+                range=range_name,
+                valueInputOption="USER_ENTERED",
+                body=request_body
+            ))
+            worksheet_snapshots.invalidate(spreadsheet_id)
 
         return {"message": f"Row {empty_row} updated/added successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Endpoint for adding many content plan rows with one append request
+@app.post("/add_content_plan_rows/")
+async def add_content_plan_rows_endpoint(request_body: ContentPlanRowsData):
+    if not request_body.rows:
+        raise HTTPException(status_code=400, detail="No rows to add")
+    try:
+        first_row = await append_content_plan_rows(request_body.spreadsheet_id, request_body.sheet_name,
+                                                   [content_plan_values(row) for row in request_body.rows])
+        worksheet_snapshots.invalidate(request_body.spreadsheet_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    last_row = first_row + len(request_body.rows) - 1 if first_row is not None else None
+    return {"message": f"Rows {first_row} to {last_row} added successfully.", "first_row": first_row, "last_row": last_row}
+
 
 
 # Define the data model for Spreadsheet Cell Update
@@ -507,21 +2701,215 @@ async def update_spreadsheet_cell_endpoint(request_data: SpreadsheetCellUpdate):
 
     try:
         cell = f"{cell_column}{cell_row}"
+        if write_behind is not None:
+            await write_behind.write(spreadsheet_id, cell_key(request_data), content)
+            return {"message": f"Cell {cell} in {sheet_name} updated successfully!"}
         values = [[content]]
         body = {
             'values': values
         }
         range_name = f"{sheet_name}!{cell}"
         value_input_option = "USER_ENTERED"
-        result = spreadsheet_service.spreadsheets().values().update(
+        result = await execute_async(masked(
+            spreadsheet_service.spreadsheets().values().update, "values_update",
             spreadsheetId=spreadsheet_id,
             range=range_name,
             valueInputOption=value_input_option,
             body=body
-        ).execute()
+        ))
+        worksheet_snapshots.invalidate(spreadsheet_id)
         return {"message": f"Cell {cell} in {sheet_name} updated successfully!"}
     except Exception as e:
         return {"error": str(e)}
+
+# Merge single-cell writes {(row, column): value} into rectangular blocks: runs of adjacent
+# columns within a row, stacked while consecutive rows have a run with the same columns.
+# Returns (top_row, left_column, values) tuples.
+def coalesce_cells(cells):
+    rows = {}
+    for (row, column), value in cells.items():
+        rows.setdefault(row, {})[column] = value
+
+    blocks = []
+    open_blocks = {}
+    for row in sorted(rows):
+        runs = []
+        for column in sorted(rows[row]):
+            if runs and runs[-1][0] + len(runs[-1][1]) == column:
+                runs[-1][1].append(rows[row][column])
+            else:
+                runs.append((column, [rows[row][column]]))
+        next_open = {}
+        for left, values in runs:
+            key = (left, len(values))
+            block = open_blocks.get(key)
+            if block is not None and block[0] + len(block[2]) == row:
+                block[2].append(values)
+            else:
+                block = (row, left, [values])
+                blocks.append(block)
+            next_open[key] = block
+        open_blocks = next_open
+    return blocks
+
+# values().batchUpdate data for cells {(sheet_name, row, column): value}, one entry per coalesced block
+def cell_update_data(cells):
+    by_sheet = {}
+    for (sheet_name, row, column), value in cells.items():
+        by_sheet.setdefault(sheet_name, {})[(row, column)] = value
+    data = []
+    for sheet_name, sheet_cells in by_sheet.items():
+        for top, left, values in coalesce_cells(sheet_cells):
+            cells_range = f"{column_letters(left)}{top}:{column_letters(left + len(values[0]) - 1)}{top + len(values) - 1}"
+            data.append({"range": a1_range(sheet_name, cells_range), "values": values})
+    return data
+
+# Write cells {(sheet_name, row, column): value} to one spreadsheet with a single values().batchUpdate.
+# Returns the A1 ranges written.
+async def batch_update_cells(spreadsheet_id, cells):
+    data = cell_update_data(cells)
+    await execute_async(masked(
+        spreadsheet_service.spreadsheets().values().batchUpdate, "values_batch_update",
+        spreadsheetId=spreadsheet_id,
+        body={"valueInputOption": "USER_ENTERED", "data": data}
+    ))
+    worksheet_snapshots.invalidate(spreadsheet_id)
+    return [entry["range"] for entry in data]
+
+# Parse a cell update into its (sheet_name, row, column) key
+def cell_key(update):
+    if not A1_COLUMN.match(update.cell_column) or not update.cell_row.isdigit() or int(update.cell_row) < 1:
+        raise ValueError(f"Invalid cell {update.cell_column}{update.cell_row}")
+    return update.sheet_name, int(update.cell_row), column_index(update.cell_column)
+
+# Buffers single-cell writes for a few milliseconds and flushes each spreadsheet's pending
+# cells as one coalesced batchUpdate. Every caller waits for the flush that carries its write.
+class WriteBehindBuffer:
+    def __init__(self, delay_seconds):
+        self.delay = delay_seconds
+        self.pending = {}
+        self.flushes = 0
+        self.buffered_writes = 0
+
+    async def write(self, spreadsheet_id, key, value):
+        entry = self.pending.get(spreadsheet_id)
+        if entry is None:
+            entry = self.pending[spreadsheet_id] = {"cells": {}, "waiters": []}
+            asyncio.get_running_loop().call_later(self.delay, lambda: asyncio.ensure_future(self.flush(spreadsheet_id)))
+        entry["cells"][key] = value
+        waiter = asyncio.get_running_loop().create_future()
+        entry["waiters"].append(waiter)
+        self.buffered_writes += 1
+        return await waiter
+
+    async def flush(self, spreadsheet_id):
+        # Scheduled from whichever request wrote first; the flush is not part of its response
+        request_timings.set(None)
+        entry = self.pending.pop(spreadsheet_id, None)
+        if entry is None:
+            return
+        self.flushes += 1
+        try:
+            ranges = await batch_update_cells(spreadsheet_id, entry["cells"])
+        except Exception as e:
+            for waiter in entry["waiters"]:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in entry["waiters"]:
+                if not waiter.done():
+                    waiter.set_result(ranges)
+
+    def stats(self):
+        return {"delay_ms": self.delay * 1000, "buffered_writes": self.buffered_writes, "flushes": self.flushes}
+
+# Set WRITE_BEHIND_MS to route /update_spreadsheet_cell/ through the write-behind buffer
+WRITE_BEHIND_MS = float(os.getenv("WRITE_BEHIND_MS", "0"))
+write_behind = WriteBehindBuffer(WRITE_BEHIND_MS / 1000) if WRITE_BEHIND_MS > 0 else None
+
+# Pydantic model for batch cell updates
+class BatchCellUpdateRequest(BaseModel):
+    updates: List[SpreadsheetCellUpdate]
+
+# Endpoint to update many cells, across one or more spreadsheets, with one batchUpdate per spreadsheet
+@app.post("/batch_update_cells")
+async def batch_update_cells_endpoint(request_data: BatchCellUpdateRequest):
+    by_spreadsheet = {}
+    try:
+        for update in request_data.updates:
+            by_spreadsheet.setdefault(update.spreadsheet_id, {})[cell_key(update)] = update.content
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def apply(spreadsheet_id, cells):
+        try:
+            ranges = await batch_update_cells(spreadsheet_id, cells)
+            return {"spreadsheet_id": spreadsheet_id, "updated_cells": len(cells), "ranges": ranges}
+        except Exception as e:
+            return {"spreadsheet_id": spreadsheet_id, "error": str(e)}
+
+    results = await asyncio.gather(*(apply(spreadsheet_id, cells) for spreadsheet_id, cells in by_spreadsheet.items()))
+    return {"results": results}
+
+A1_CELL = re.compile(r"^([A-Za-z]{1,3})([1-9]\d*)$")
+
+# Cells compare the way USER_ENTERED would store them: 12, 12.0 and "12" are equal, None is blank
+def sync_cell_key(value):
+    return "" if value is None else equality_key(value)
+
+# Cells of a table starting at (top, left) that differ from the current values, as
+# {(sheet_name, row, column): value}. Rows are compared whole first, so unchanged rows cost one
+# tuple comparison; the values read back are padded since Sheets trims trailing blanks.
+def diff_table(sheet_name, top, left, desired, current):
+    width = max(len(row) for row in desired)
+    changed = {}
+    for offset, row in enumerate(desired):
+        wanted = tuple(sync_cell_key(value) for value in row) + ("",) * (width - len(row))
+        existing = current[offset] if offset < len(current) else []
+        have = tuple(sync_cell_key(value) for value in existing[:width]) + ("",) * (width - min(len(existing), width))
+        if wanted == have:
+            continue
+        for column, (new, old) in enumerate(zip(wanted, have)):
+            if new != old:
+                value = row[column] if column < len(row) else ""
+                changed[(sheet_name, top + offset, left + column)] = "" if value is None else value
+    return changed
+
+# Pydantic model for syncing a table into a worksheet
+class SyncWorksheetRequest(BaseModel):
+    spreadsheet_id: str
+    sheet_name: str
+    values: List[List[Union[str, int, float, bool, None]]]  # Desired table; short rows are padded with blanks
+    start_cell: str = "A1"  # Top-left cell of the table
+    dry_run: bool = False  # Report the ranges that would be written without writing them
+
+# Endpoint to make a range match a table: one read (formulas, not their results) and one
+# batchUpdate covering only the changed cells. A sync with nothing to change writes nothing.
+@app.post("/sync_worksheet")
+async def sync_worksheet_endpoint(request_data: SyncWorksheetRequest):
+    match = A1_CELL.match(request_data.start_cell)
+    if not match:
+        raise HTTPException(status_code=400, detail=f"Invalid start_cell {request_data.start_cell}")
+    if not request_data.values or not any(request_data.values):
+        raise HTTPException(status_code=400, detail="values must contain at least one cell")
+    sheet_name = request_data.sheet_name
+    left, top = column_index(match.group(1)), int(match.group(2))
+    width = max(len(row) for row in request_data.values)
+    cells_range = f"{column_letters(left)}{top}:{column_letters(left + width - 1)}{top + len(request_data.values) - 1}"
+    try:
+        result = await execute_async(values_get_request(request_data.spreadsheet_id, a1_range(sheet_name, cells_range), "FORMULA"))
+        changed = diff_table(sheet_name, top, left, request_data.values, result.get('values', []))
+        response = {"range": a1_range(sheet_name, cells_range), "changed_cells": len(changed),
+                    "changed_rows": len({row for _, row, _ in changed})}
+        if not changed:
+            response["ranges"] = []
+        elif request_data.dry_run:
+            response["ranges"] = [entry["range"] for entry in cell_update_data(changed)]
+        else:
+            response["ranges"] = await batch_update_cells(request_data.spreadsheet_id, changed)
+        return response
+    except Exception as e:
+        return {"error": str(e)}
     
 # @app.delete("/delete_all_files")
 # async def delete_all_files_endpoint(exclude_ids: list = Query(None)):
@@ -548,7 +2936,7 @@ class SpreadsheetRequest(BaseModel):
     column_letter: str
 
 # Function to check an empty cell
-def is_cell_empty(spreadsheet_id: str, sheet_name: str, row: int, column_letter: str) -> bool:
+async def is_cell_empty(spreadsheet_id: str, sheet_name: str, row: int, column_letter: str) -> bool:
 
     sheet = spreadsheet_service.spreadsheets()
     
@@ -557,7 +2945,7 @@ def is_cell_empty(spreadsheet_id: str, sheet_name: str, row: int, column_letter:
     range = f'{sheet_name}!{column_letter}{row}'
 
     # Get the cell value
-    result = sheet.values().get(spreadsheetId=spreadsheet_id, range=range).execute()
+    result = await execute_async(masked(sheet.values().get, "values", spreadsheetId=spreadsheet_id, range=range))
     values = result.get('values', [])
 
     # Check if the cell is empty
@@ -565,8 +2953,71 @@ def is_cell_empty(spreadsheet_id: str, sheet_name: str, row: int, column_letter:
 
 # FastAPI endpoint
 @app.post("/check_empty_cell")
-def check_empty_cell_endpoint(request: SpreadsheetRequest):
-    empty = is_cell_empty(request.spreadsheet_id, request.sheet_name, request.row, request.column_letter)
+async def check_empty_cell_endpoint(request: SpreadsheetRequest):
+    empty = await is_cell_empty(request.spreadsheet_id, request.sheet_name, request.row, request.column_letter)
+    return {"empty": empty}
+
+# A sheet's cells are read as one bounding range when that range holds at most this many
+# cells per probed cell (and no more than EMPTY_CHECK_MAX_BOUNDING_CELLS overall)
+EMPTY_CHECK_BOUNDING_FACTOR = int(os.getenv("EMPTY_CHECK_BOUNDING_FACTOR", "4"))
+EMPTY_CHECK_MAX_BOUNDING_CELLS = int(os.getenv("EMPTY_CHECK_MAX_BOUNDING_CELLS", "10000"))
+
+class CellCoordinate(BaseModel):
+    sheet_name: str
+    row: int = Field(..., ge=1)
+    column_letter: str = Field(..., pattern=r"^[A-Za-z]{1,3}$")
+
+# Define the Pydantic model for the bulk empty-cell check
+class BulkEmptyCellRequest(BaseModel):
+    spreadsheet_id: str
+    cells: List[CellCoordinate]
+
+# Function to check many cells with a single values().batchGet. Per sheet, the probe is either one
+# bounding range covering all of that sheet's cells, or one single-cell range per cell, whichever
+# reads less. Returns {"Sheet!A1": empty}.
+async def are_cells_empty(spreadsheet_id, cells):
+    by_sheet = {}
+    for cell in cells:
+        by_sheet.setdefault(cell.sheet_name, set()).add((cell.row, column_index(cell.column_letter)))
+
+    ranges = []
+    readers = []
+    for sheet_name, coordinates in by_sheet.items():
+        top = min(row for row, _ in coordinates)
+        bottom = max(row for row, _ in coordinates)
+        left = min(column for _, column in coordinates)
+        right = max(column for _, column in coordinates)
+        area = (bottom - top + 1) * (right - left + 1)
+        if len(coordinates) > 1 and area <= min(EMPTY_CHECK_BOUNDING_FACTOR * len(coordinates), EMPTY_CHECK_MAX_BOUNDING_CELLS):
+            ranges.append(a1_range(sheet_name, f"{column_letters(left)}{top}:{column_letters(right)}{bottom}"))
+            readers.append((sheet_name, top, left, sorted(coordinates)))
+        else:
+            for row, column in sorted(coordinates):
+                ranges.append(a1_range(sheet_name, f"{column_letters(column)}{row}"))
+                readers.append((sheet_name, row, column, [(row, column)]))
+
+    result = await execute_async(masked(
+        spreadsheet_service.spreadsheets().values().batchGet, "values_batch",
+        spreadsheetId=spreadsheet_id, ranges=ranges))
+
+    empty = {}
+    for (sheet_name, top, left, coordinates), value_range in zip(readers, result.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        for row, column in coordinates:
+            row_values = values[row - top] if row - top < len(values) else []
+            offset = column - left
+            empty[f"{sheet_name}!{column_letters(column)}{row}"] = offset >= len(row_values) or row_values[offset] == ""
+    return empty
+
+# FastAPI endpoint to check many cells at once
+@app.post("/check_empty_cells")
+async def check_empty_cells_endpoint(request: BulkEmptyCellRequest):
+    if not request.cells:
+        return {"empty": {}}
+    try:
+        empty = await are_cells_empty(request.spreadsheet_id, request.cells)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"empty": empty}
 
 @app.get("/get_spreadsheet_name/")
@@ -582,7 +3033,8 @@ async def get_spreadsheet_name_endpoint(spreadsheet_url: str):
     # Use Google Drive API to get file details
     
     try:
-        file = drive_service.files().get(fileId=file_id).execute()
+        file = await metadata_cache.get_or_load(('file', file_id),
+                                                lambda: execute_async(masked(drive_service.files().get, "file_name", fileId=file_id)))
         return {"file_name": file['name']}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,62 @@
+# Cold-start benchmark: imports app.py in fresh interpreters and reports wall time and peak RSS
+#
+# Usage: python benchmarks/cold_start.py [--runs 20] [--build-clients]
+#
+# --build-clients also builds the Drive and Sheets clients (needs GOOGLE_SHEETS_JSON_KEY_CONTENTS)
+# to measure the cost paid by the first request that touches Google.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+import asyncio
+asyncio.run(app.root())
+first_request_ms = (time.perf_counter() - start) * 1000
+build_ms = None
+if {build_clients}:
+    build_start = time.perf_counter()
+    app.drive_service.get()
+    app.spreadsheet_service.get()
+    build_ms = (time.perf_counter() - build_start) * 1000
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+print(json.dumps({{"import_ms": import_ms, "first_request_ms": first_request_ms, "build_ms": build_ms, "rss_mb": rss_kb / 1024}}))
+'''
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_once(build_clients):
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_SHEETS_JSON_KEY_CONTENTS", "{}")
+    output = subprocess.run([sys.executable, "-c", CHILD.format(build_clients=build_clients)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for app.py")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--build-clients", action="store_true")
+    args = parser.parse_args()
+
+    results = [run_once(args.build_clients) for _ in range(args.runs)]
+    metrics = ["import_ms", "first_request_ms", "rss_mb"] + (["build_ms"] if args.build_clients else [])
+    print(f"cold start over {args.runs} runs")
+    for metric in metrics:
+        samples = [result[metric] for result in results]
+        print(f"  {metric:<18} p50={statistics.median(samples):8.1f}  p99={percentile(samples, 99):8.1f}  max={max(samples):8.1f}")
+
+if __name__ == "__main__":
+    main()
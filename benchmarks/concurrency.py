@@ -0,0 +1,56 @@
+# Concurrency benchmark for the async execution layer
+#
+# Usage: python benchmarks/concurrency.py [--requests 16] [--latency-ms 200]
+#
+# Fires N parallel requests whose execute() sleeps for one simulated Google round trip and
+# compares calling execute() inline from async code (the old behaviour, which serialises the
+# event loop) with awaiting app.execute_async(). With the thread pool the batch should finish
+# in about one round trip instead of N.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class SleepRequest:
+    methodId = "benchmark.sleep"
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def execute(self, http=None, num_retries=0):
+        time.sleep(self.latency)
+        return {}
+
+
+async def inline_execute(request):
+    return request.execute()
+
+
+async def run_batch(call, requests, latency):
+    start = time.perf_counter()
+    await asyncio.gather(*(call(SleepRequest(latency)) for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency benchmark for execute_async")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    print(f"{args.requests} parallel requests, {args.latency_ms:.0f} ms simulated round trip, "
+          f"{app.GOOGLE_API_MAX_WORKERS} API workers")
+    for label, call in (("inline .execute()", inline_execute), ("execute_async()", app.execute_async)):
+        elapsed = asyncio.run(run_batch(call, args.requests, latency))
+        print(f"  {label:<18} {elapsed * 1000:8.1f} ms  ({elapsed / latency:5.1f} round trips)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Serialization benchmark for the /read_worksheet_rows output formats
+#
+# Usage: python benchmarks/export_formats.py [--rows 50000] [--columns 9]
+#
+# Builds a typed worksheet fixture (what UNFORMATTED_VALUE returns) and a formatted-string copy
+# (what the legacy "rows" format reads), encodes it with each format's serializer from app.py and
+# reports encode time, raw and gzip payload size, and client-side decode time. arrow and parquet
+# are skipped when pyarrow is not installed.
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def worksheet_fixture(rows, columns):
+    header = ["id", "keyword", "title", "volume", "difficulty", "cpc", "published", "url", "notes"][:columns]
+    header += [f"extra_{index}" for index in range(len(header), columns)]
+    makers = [
+        lambda row: row,
+        lambda row: f"keyword {row % 997}",
+        lambda row: f"How to rank for keyword {row % 997} in {2020 + row % 5}",
+        lambda row: (row * 37) % 90000,
+        lambda row: round((row % 100) / 3, 2),
+        lambda row: round((row % 500) / 100, 2),
+        lambda row: row % 3 == 0,
+        lambda row: f"https://example.com/posts/{row}",
+        lambda row: "" if row % 4 else "needs review",
+    ]
+    makers += [lambda row, column=column: f"value {row}-{column}" for column in range(len(makers), columns)]
+    values = [[makers[column](row) for column in range(columns)] for row in range(1, rows + 1)]
+    return header, values
+
+
+def formatted(values):
+    return [["TRUE" if value is True else "FALSE" if value is False else str(value) for value in row] for row in values]
+
+
+async def encode_stream(format, header, values):
+    async def no_more():
+        return
+        yield
+
+    chunks = [piece async for piece in app.stream_row_chunks((2, values), no_more(), None, format, header)]
+    return "".join(chunks).encode()
+
+
+def encoders(header, values, strings):
+    def rows():
+        return json.dumps({f"{2 + index}": row for index, row in enumerate(strings)}).encode()
+
+    cases = [("rows (legacy)", rows, json.loads),
+             ("compact", lambda: asyncio.run(encode_stream("compact", header, values)), json.loads),
+             ("ndjson", lambda: asyncio.run(encode_stream("ndjson", None, values)),
+              lambda body: [json.loads(line) for line in body.splitlines()]),
+             ("csv", lambda: asyncio.run(encode_stream("csv", None, strings)),
+              lambda body: list(csv.reader(io.StringIO(body.decode()))))]
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed; skipping arrow and parquet")
+        return cases
+    cases += [("arrow", lambda: app.encode_columnar("arrow", header, values),
+               lambda body: pa.ipc.open_stream(body).read_all()),
+              ("parquet", lambda: app.encode_columnar("parquet", header, values),
+               lambda body: pq.read_table(io.BytesIO(body)))]
+    return cases
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization benchmark for worksheet export formats")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    header, values = worksheet_fixture(args.rows, args.columns)
+    strings = formatted(values)
+    print(f"{args.rows:,} rows x {args.columns} columns")
+    print(f"{'format':<16}{'encode ms':>11}{'bytes':>14}{'gzip':>12}{'decode ms':>11}")
+    for label, encode, decode in encoders(header, values, strings):
+        body, encode_ms = timed(encode, args.repeat)
+        _, decode_ms = timed(lambda: decode(body), args.repeat)
+        print(f"{label:<16}{encode_ms:>11.1f}{len(body):>14,}{len(gzip.compress(body)):>12,}{decode_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Payload-size benchmark for the partial-response masks in app.FIELD_MASKS
+#
+# Usage: python benchmarks/field_masks.py [--sheets 150] [--mbps 50]
+#
+# Builds full-resource fixtures (a large spreadsheet's metadata, a Drive file resource and a
+# permission list), projects them through the masks app.py now sends, and reports raw and gzip
+# bytes, client-side decode time and estimated transfer time for the full vs masked response.
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from fake_google import parse_mask, project_fields as project
+
+
+def grid_range(sheet_id, row):
+    return {"sheetId": sheet_id, "startRowIndex": row, "endRowIndex": row + 50, "startColumnIndex": 0, "endColumnIndex": 12}
+
+
+def spreadsheet_fixture(sheet_count):
+    sheets = []
+    for sheet_id in range(sheet_count):
+        sheets.append({
+            "properties": {
+                "sheetId": sheet_id, "title": f"Content plan {sheet_id:03d}", "index": sheet_id, "sheetType": "GRID",
+                "gridProperties": {"rowCount": 5000, "columnCount": 26, "frozenRowCount": 1},
+                "tabColorStyle": {"rgbColor": {"red": 0.2, "green": 0.6, "blue": 0.9}},
+            },
+            "conditionalFormats": [{
+                "ranges": [grid_range(sheet_id, rule * 50)],
+                "booleanRule": {
+                    "condition": {"type": "TEXT_CONTAINS", "values": [{"userEnteredValue": f"keyword-{rule}"}]},
+                    "format": {"backgroundColor": {"red": 1, "green": 0.9, "blue": 0.8},
+                               "textFormat": {"bold": True, "foregroundColor": {"red": 0.6}}},
+                },
+            } for rule in range(40)],
+            "protectedRanges": [{
+                "protectedRangeId": sheet_id * 100 + index, "range": grid_range(sheet_id, index * 100),
+                "description": "Locked by automation", "warningOnly": False, "requestingUserCanEdit": True,
+                "editors": {"users": [f"editor{user}@example.com" for user in range(5)]},
+            } for index in range(15)],
+            "merges": [grid_range(sheet_id, index * 10) for index in range(30)],
+            "bandedRanges": [{"bandedRangeId": sheet_id, "range": grid_range(sheet_id, 0),
+                              "rowProperties": {"headerColor": {"red": 0.3}, "firstBandColor": {"red": 1},
+                                                "secondBandColor": {"red": 0.95}}}],
+            "developerMetadata": [{"metadataId": sheet_id, "metadataKey": "pipeline", "metadataValue": "content-plan",
+                                   "location": {"sheetId": sheet_id}, "visibility": "DOCUMENT"}],
+        })
+    return {
+        "spreadsheetId": "1" * 44,
+        "properties": {"title": "Client content plan", "locale": "en_US", "autoRecalc": "ON_CHANGE",
+                       "timeZone": "Asia/Ho_Chi_Minh", "defaultFormat": {"backgroundColor": {"red": 1, "green": 1, "blue": 1}}},
+        "sheets": sheets,
+        "namedRanges": [{"namedRangeId": str(index), "name": f"range_{index}", "range": grid_range(index % sheet_count, 0)}
+                        for index in range(200)],
+        "spreadsheetUrl": "https://docs.google.com/spreadsheets/d/" + "1" * 44 + "/edit",
+    }
+
+
+def drive_file_fixture():
+    return {
+        "kind": "drive#file", "id": "1" * 44, "name": "Client content plan",
+        "mimeType": "application/vnd.google-apps.spreadsheet", "starred": False, "trashed": False,
+        "explicitlyTrashed": False, "parents": ["0" * 33], "spaces": ["drive"], "version": "1024",
+        "webViewLink": "https://docs.google.com/spreadsheets/d/" + "1" * 44 + "/edit?usp=drivesdk",
+        "iconLink": "https://drive-thirdparty.googleusercontent.com/16/type/application/vnd.google-apps.spreadsheet",
+        "hasThumbnail": True, "thumbnailLink": "https://lh3.googleusercontent.com/" + "t" * 120,
+        "thumbnailVersion": "12", "viewedByMe": True, "createdTime": "2023-11-20T08:00:00.000Z",
+        "modifiedTime": "2023-12-01T08:00:00.000Z", "modifiedByMeTime": "2023-12-01T08:00:00.000Z", "modifiedByMe": True,
+        "owners": [{"kind": "drive#user", "displayName": "automation", "photoLink": "https://lh3.googleusercontent.com/a/x",
+                    "me": True, "permissionId": "0" * 20, "emailAddress": "automation@project.iam.gserviceaccount.com"}],
+        "lastModifyingUser": {"kind": "drive#user", "displayName": "automation", "me": True, "permissionId": "0" * 20,
+                              "emailAddress": "automation@project.iam.gserviceaccount.com"},
+        "shared": True, "ownedByMe": True,
+        "capabilities": {name: True for name in (
+            "canAcceptOwnership", "canAddChildren", "canAddMyDriveParent", "canChangeCopyRequiresWriterPermission",
+            "canChangeSecurityUpdateEnabled", "canChangeViewersCanCopyContent", "canComment", "canCopy", "canDelete",
+            "canDownload", "canEdit", "canListChildren", "canModifyContent", "canModifyLabels", "canMoveItemIntoTeamDrive",
+            "canMoveItemOutOfDrive", "canMoveItemWithinDrive", "canReadLabels", "canReadRevisions", "canRemoveChildren",
+            "canRemoveMyDriveParent", "canRename", "canShare", "canTrash", "canUntrash")},
+        "viewersCanCopyContent": True, "copyRequiresWriterPermission": False, "writersCanShare": True,
+        "permissionIds": [str(index) * 20 for index in range(10)],
+        "linkShareMetadata": {"securityUpdateEligible": False, "securityUpdateEnabled": True},
+    }
+
+
+def permissions_fixture(count):
+    return {"permissions": [{
+        "kind": "drive#permission", "id": f"{index:020d}", "type": "user", "emailAddress": f"user{index}@example.com",
+        "role": "writer", "displayName": f"User {index}", "photoLink": "https://lh3.googleusercontent.com/a/" + "p" * 60,
+        "deleted": False, "pendingOwner": False,
+        "permissionDetails": [{"permissionType": "file", "role": "writer", "inherited": False}],
+    } for index in range(count)]}
+
+
+def measure(payload, repeat, mbps):
+    body = json.dumps(payload).encode()
+    compressed = len(gzip.compress(body))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(body)
+    decode_ms = (time.perf_counter() - start) / repeat * 1000
+    transfer_ms = compressed * 8 / (mbps * 1_000_000) * 1000
+    return len(body), compressed, decode_ms, transfer_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload-size benchmark for app.FIELD_MASKS")
+    parser.add_argument("--sheets", type=int, default=150)
+    parser.add_argument("--permissions", type=int, default=60)
+    parser.add_argument("--mbps", type=float, default=50, help="assumed downstream bandwidth for transfer estimates")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ("get_sheet_names", spreadsheet_fixture(args.sheets), "sheet_names"),
+        ("get_spreadsheet_name", drive_file_fixture(), "file_name"),
+        ("update_permission_role", permissions_fixture(args.permissions), "permission_lookup"),
+    ]
+    print(f"{'call':<24}{'variant':<8}{'bytes':>12}{'gzip':>10}{'decode ms':>11}{'xfer ms':>10}")
+    for label, payload, mask in cases:
+        full = measure(payload, args.repeat, args.mbps)
+        partial = measure(project(payload, parse_mask(app.FIELD_MASKS[mask])), args.repeat, args.mbps)
+        for variant, (raw, compressed, decode_ms, transfer_ms) in (("full", full), ("masked", partial)):
+            print(f"{label:<24}{variant:<8}{raw:>12,}{compressed:>10,}{decode_ms:>11.2f}{transfer_ms:>10.2f}")
+        saved_ms = (full[2] + full[3]) - (partial[2] + partial[3])
+        print(f"{'':<24}{'saved':<8}{full[0] - partial[0]:>12,}{full[1] - partial[1]:>10,}{'':>11}{saved_ms:>10.2f} total")
+
+
+if __name__ == "__main__":
+    main()
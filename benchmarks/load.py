@@ -0,0 +1,184 @@
+# End-to-end load benchmark against the in-process Google stand-in (fake_google.py)
+#
+# Usage: python benchmarks/load.py [--requests 200] [--concurrency 16] [--latency-ms 50]
+#                                  [--error-rate 0] [--rate-limit-rate 0] [--only read_worksheet_rows ...]
+#
+# Runs app.py with GOOGLE_API_BACKEND=fake, seeds a Drive tree and a content plan spreadsheet,
+# then drives each endpoint through the ASGI app (httpx, no network) with --concurrency requests
+# in flight and reports throughput, p50/p95/p99 latency and error counts per endpoint. The fake's
+# latency, error and 429 rates stand in for Google; Sheets quotas are lifted so the client-side
+# rate limiter does not dominate the numbers (override with SHEETS_READS_PER_MINUTE etc.).
+# The fake evaluates Drive queries by scanning every file, so listing-heavy endpoints (folder_tree,
+# searches) include that CPU cost on top of the simulated latency. Like Google, the fake returns only
+# the fields named in each request's `fields` mask, so response sizes follow app.FIELD_MASKS.
+# drive_mirror_resync runs only with --drive-mirror, which also serves the listings from the mirror.
+# Needs httpx.
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["GOOGLE_API_BACKEND"] = "fake"
+for name in ("DRIVE_REQUESTS_PER_MINUTE", "SHEETS_READS_PER_MINUTE", "SHEETS_WRITES_PER_MINUTE"):
+    os.environ.setdefault(name, "1000000")
+
+import httpx
+
+import app
+import fake_google
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(backend, files, rows):
+    root = backend.add_folder("Load test")
+    clients = [backend.add_folder(f"Client {index}", root["id"]) for index in range(10)]
+    for client in clients:
+        for index in range(5):
+            backend.add_folder(f"Month {index}", client["id"])
+    for index in range(files):
+        backend.add_file(f"asset {index}.png", "image/png", [clients[index % len(clients)]["id"]])
+    header = ["", "video_number", "content_pillar", "video_title", "video_summary", "keywords",
+              "video_description", "tags", "hashtags", "cta"]
+    plan = [header] + [["", str(row), f"pillar {row % 7}", f"Video {row}", "summary", "kw", "description",
+                        "tags", "#tag", "subscribe"] for row in range(1, rows + 1)]
+    template = backend.add_spreadsheet("Content plan", {"Plan": plan, "Notes": []}, root["id"])
+    return root, clients, template
+
+
+def scenarios(root, clients, template, job_id):
+    counter = itertools.count()
+    spreadsheet_id = template["id"]
+    client_id = clients[0]["id"]
+    plan_row = {"video_number": "1", "content_pillar": "p", "video_title": "t", "video_summary": "s", "keywords": "k",
+                "video_description": "d", "tags": "t", "hashtags": "#h", "cta": "c"}
+    return {
+        "root": ("GET", "/", None),
+        "stats": ("GET", "/stats", None),
+        "metrics": ("GET", "/metrics", None),
+        "create_google_sheet": ("POST", "/create_google_sheet/", lambda: {
+            "new_spreadsheet_title": f"Copy {next(counter)}", "permissions_email": "team@example.com",
+            "source_spreadsheet_id": spreadsheet_id, "folder_id": client_id}),
+        "create_folder": ("POST", "/create_folder", lambda: {"parent_folder_id": client_id, "folder_name": f"Folder {next(counter)}"}),
+        "provision": ("POST", "/provision", lambda: {
+            "folders": [{"key": "client", "folder_name": f"Client {next(counter)}", "parent_folder_id": root["id"]}],
+            "copies": [{"source_spreadsheet_id": spreadsheet_id, "new_spreadsheet_title": "Plan", "folder": "client"}]}),
+        "search_folder_in_folder": ("POST", "/search_folder_in_folder/", lambda: {"keywords": "Client", "parent_folder_id": root["id"]}),
+        "list_drive_files": ("GET", "/list_drive_files?limit=100", None),
+        "list_files_in_folder": ("GET", f"/list_files_in_folder/{client_id}", None),
+        "list_folders_in_folder": ("GET", f"/list_folders_in_folder/{root['id']}", None),
+        "search_file_in_folder": ("POST", "/search_file_in_folder", lambda: {"folder_id": client_id, "file_name": "asset 10.png"}),
+        "folder_tree": ("GET", f"/folder_tree/{root['id']}", None),
+        "share_file": ("POST", "/share_file/", lambda: {"file_id": spreadsheet_id, "permission_email": f"user{next(counter) % 50}@example.com", "role": "reader"}),
+        "share_folder": ("POST", "/share_folder/", lambda: {"folder_id": client_id, "permission_email": f"user{next(counter) % 50}@example.com", "role": "reader"}),
+        "update_permission_role": ("POST", "/update_permission_role/", lambda: {
+            "file_id": spreadsheet_id, "permission_email": f"user{next(counter) % 50}@example.com", "new_role": "writer"}),
+        "share_bulk": ("POST", "/share_bulk", lambda: {"file_ids": [client["id"] for client in clients],
+                                                       "emails": [f"team{next(counter) % 5}@example.com"], "role": "reader"}),
+        "get_sheet_names": ("POST", "/get_sheet_names", lambda: {"spreadsheet_id": spreadsheet_id}),
+        "add_new_sheet": ("POST", "/add_new_sheet", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": f"Sheet {next(counter)}"}),
+        "read_worksheet_rows": ("POST", "/read_worksheet_rows", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Plan"}),
+        "read_worksheet_rows_compact": ("POST", "/read_worksheet_rows", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Plan", "format": "compact"}),
+        "query_worksheet": ("POST", "/query_worksheet", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Plan",
+                                                                 "where": [{"column": "video_number", "value": next(counter) % 500}]}),
+        "add_content_plan_row": ("POST", "/add_content_plan_row/", lambda: {**plan_row, "spreadsheet_id": spreadsheet_id,
+                                                                            "sheet_name": "Plan", "mode": "append"}),
+        "add_content_plan_rows": ("POST", "/add_content_plan_rows/", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Plan",
+                                                                              "rows": [plan_row] * 5}),
+        "update_spreadsheet_cell": ("POST", "/update_spreadsheet_cell/", lambda: {
+            "spreadsheet_id": spreadsheet_id, "sheet_name": "Notes", "cell_column": "A", "cell_row": str(next(counter) % 100 + 1), "content": "x"}),
+        "batch_update_cells": ("POST", "/batch_update_cells", lambda: {"updates": [
+            {"spreadsheet_id": spreadsheet_id, "sheet_name": "Notes", "cell_column": column, "cell_row": str(row), "content": "y"}
+            for row in range(1, 6) for column in "ABC"]}),
+        "sync_worksheet": ("POST", "/sync_worksheet", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Notes", "start_cell": "E1",
+                                                               "values": [[f"row {row}", row, next(counter) % 2 == 0 and row == 1]
+                                                                          for row in range(1, 201)]}),
+        "check_empty_cell": ("POST", "/check_empty_cell", lambda: {"spreadsheet_id": spreadsheet_id, "sheet_name": "Plan",
+                                                                   "row": next(counter) % 1000 + 1, "column_letter": "B"}),
+        "check_empty_cells": ("POST", "/check_empty_cells", lambda: {"spreadsheet_id": spreadsheet_id, "cells": [
+            {"sheet_name": "Plan", "row": row, "column_letter": "C"} for row in range(1, 21)]}),
+        "submit_job": ("POST", "/jobs", lambda: {"kind": "folder_tree", "params": {"folder_id": clients[next(counter) % len(clients)]["id"]}}),
+        "get_job": ("GET", f"/jobs/{job_id}", None),
+        "list_jobs": ("GET", "/jobs?limit=100", None),
+        "drive_mirror_resync": ("POST", "/drive_mirror/resync", None),
+        "get_spreadsheet_name": ("GET", f"/get_spreadsheet_name/?spreadsheet_url=https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit", None),
+    }
+
+
+async def run_scenario(client, method, path, body, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body() if body else None)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400 or (response.headers.get("content-type", "").startswith("application/json")
+                                               and response.content.startswith(b'{"error"')):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark against fake_google")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50, help="simulated Google round trip")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--files", type=int, default=2000, help="seeded Drive files")
+    parser.add_argument("--rows", type=int, default=2000, help="seeded content plan rows")
+    parser.add_argument("--only", nargs="*", help="endpoints to run (default: all)")
+    parser.add_argument("--drive-mirror", action="store_true", help="serve Drive listings from the in-memory mirror")
+    args = parser.parse_args()
+
+    backend = fake_google.default_backend()
+    backend.config = fake_google.FakeConfig(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate,
+                                            rate_limit_rate=args.rate_limit_rate, retry_after=0, seed=1)
+    root, clients, template = seed(backend, args.files, args.rows)
+    if args.drive_mirror:
+        app.drive_mirror = app.DriveMirror(app.DRIVE_MIRROR_MAX_LAG)
+    # get_job polls a job that exists before the run starts
+    job = await app.job_runner.submit("folder_tree", app.FolderTreeJobRequest(folder_id=root["id"]))
+    cases = scenarios(root, clients, template, job["id"])
+    unknown = set(args.only or []) - set(cases)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}, "
+          f"{args.latency_ms:.0f}±{args.jitter_ms:.0f} ms simulated Google latency")
+    print(f"{'endpoint':<30}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'google calls':>14}")
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+        for name, (method, path, body) in cases.items():
+            if args.only and name not in args.only:
+                continue
+            if name == "drive_mirror_resync" and app.drive_mirror is None:
+                print(f"{name:<30}skipped (needs --drive-mirror)")
+                continue
+            calls_before = sum(backend.calls.values())
+            elapsed, latencies, errors = await run_scenario(client, method, path, body, args.requests, args.concurrency)
+            calls = sum(backend.calls.values()) - calls_before
+            ms = [latency * 1000 for latency in latencies]
+            print(f"{name:<30}{len(latencies) / elapsed:>9.1f}{statistics.median(ms):>9.1f}{percentile(ms, 95):>9.1f}"
+                  f"{percentile(ms, 99):>9.1f}{errors:>8}{calls:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
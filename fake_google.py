@@ -0,0 +1,663 @@
+# In-process stand-in for the Drive v3 and Sheets v4 clients used by app.py
+#
+# Implements the subset of files/permissions/changes/spreadsheets/values calls that app.py makes,
+# with configurable latency, random error injection and 429 injection, so the app can be
+# exercised and load-tested without touching Google quota.
+#
+# Run the app against it with GOOGLE_API_BACKEND=fake (see FakeConfig.from_env for the knobs),
+# or hand a FakeBackend's .drive / .sheets to app.drive_service.set() / app.spreadsheet_service.set().
+import json
+import os
+import random
+import re
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+
+
+def _new_id(length=33):
+    return ''.join(random.choices(string.ascii_letters + string.digits + '-_', k=length))
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _http_error(status, message, retry_after=None):
+    resp = httplib2.Response({'status': status})
+    if retry_after is not None:
+        resp['retry-after'] = str(retry_after)
+    content = json.dumps({'error': {'code': status, 'message': message}}).encode()
+    return HttpError(resp, content)
+
+
+# Behaviour knobs shared by every request a FakeBackend hands out
+class FakeConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls):
+        seed = os.getenv("FAKE_GOOGLE_SEED")
+        return cls(latency=float(os.getenv("FAKE_GOOGLE_LATENCY_MS", "0")) / 1000,
+                   jitter=float(os.getenv("FAKE_GOOGLE_JITTER_MS", "0")) / 1000,
+                   error_rate=float(os.getenv("FAKE_GOOGLE_ERROR_RATE", "0")),
+                   rate_limit_rate=float(os.getenv("FAKE_GOOGLE_RATE_LIMIT_RATE", "0")),
+                   retry_after=float(os.getenv("FAKE_GOOGLE_RETRY_AFTER", "1")),
+                   seed=int(seed) if seed is not None else None)
+
+
+# Parse a Google field mask ("a.b, c(d, e)") into a nested dict; {} selects the whole value
+def parse_mask(mask):
+    tree = {}
+    position = 0
+
+    def parse_list(target, closing):
+        nonlocal position
+        while position < len(mask):
+            if mask[position] in ", ":
+                position += 1
+                continue
+            if mask[position] == closing:
+                position += 1
+                return
+            parse_path(target)
+
+    def parse_path(target):
+        nonlocal position
+        start = position
+        while position < len(mask) and mask[position] not in ".,() ":
+            position += 1
+        node = target.setdefault(mask[start:position], {})
+        if position < len(mask) and mask[position] == ".":
+            position += 1
+            parse_path(node)
+        elif position < len(mask) and mask[position] == "(":
+            position += 1
+            parse_list(node, ")")
+
+    parse_list(tree, None)
+    return tree
+
+
+def project_fields(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+# Mirrors googleapiclient.http.HttpRequest: nothing happens until execute()
+class FakeRequest:
+    def __init__(self, backend, method_id, handler, params=None, fields=None):
+        self.backend = backend
+        self.methodId = method_id
+        self.handler = handler
+        self.fields = fields if fields is not None else (params or {}).get('fields')
+        self.postproc = self._postproc
+        # Reads get a GET method and a URI built from their parameters, like the real client
+        self.method = 'GET' if params is not None else 'POST'
+        query = urlencode(sorted((key, str(value)) for key, value in (params or {}).items() if value is not None))
+        self.uri = f'https://fake.googleapis.com/{method_id}?{query}'
+
+    @staticmethod
+    def _postproc(resp, content):
+        return json.loads(content) if content else {}
+
+    # Run the handler and, like Google, return only the fields the request asked for
+    def respond(self):
+        result = self.handler()
+        return project_fields(result, parse_mask(self.fields)) if self.fields else result
+
+    def execute(self, http=None, num_retries=0):
+        config = self.backend.config
+        self.backend.count_call(self.methodId)
+        delay = config.latency + (config.random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if config.rate_limit_rate and config.random.random() < config.rate_limit_rate:
+            raise _http_error(429, 'Quota exceeded (injected)', retry_after=config.retry_after)
+        if config.error_rate and config.random.random() < config.error_rate:
+            raise _http_error(503, 'Backend error (injected)')
+        with self.backend.lock:
+            result = self.respond()
+        content = json.dumps(result).encode()
+        return self.postproc(httplib2.Response({'status': 200}), content)
+
+
+# Mirrors googleapiclient.http.BatchHttpRequest for permission batches
+class FakeBatchRequest:
+    methodId = None
+
+    def __init__(self, backend, callback=None, batch_uri=None):
+        self.backend = backend
+        self._callback = callback
+        self._batch_uri = batch_uri or 'https://www.googleapis.com/batch/drive/v3'
+        self._requests = {}
+        self._callbacks = {}
+        self._order = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self._order) >= 1000:
+            raise ValueError('Too many requests in batch')
+        request_id = request_id if request_id is not None else str(len(self._order) + 1)
+        if request_id in self._requests:
+            raise KeyError(f'A request with this ID already exists: {request_id}')
+        self._requests[request_id] = request
+        self._callbacks[request_id] = callback
+        self._order.append(request_id)
+
+    def execute(self, http=None):
+        config = self.backend.config
+        self.backend.count_call('batch')
+        if config.latency:
+            time.sleep(config.latency)
+        for request_id in self._order:
+            request, callback = self._requests[request_id], self._callbacks[request_id]
+            self.backend.count_call(request.methodId)
+            response, exception = None, None
+            try:
+                if config.rate_limit_rate and config.random.random() < config.rate_limit_rate:
+                    raise _http_error(429, 'Quota exceeded (injected)', retry_after=config.retry_after)
+                with self.backend.lock:
+                    response = request.respond()
+            except HttpError as e:
+                exception = e
+            for cb in (callback, self._callback):
+                if cb is not None:
+                    cb(request_id, response, exception)
+
+
+# Tiny evaluator for the Drive query language subset used by app.py:
+#   'id' in parents, name = '..', name contains '..', mimeType = / != '..', trashed = bool,
+#   joined with and/or and grouped with parentheses
+_QUERY_TOKEN = re.compile(r"\s*(?:(\()|(\))|('(?:[^'\\]|\\.)*')|(!=|=)|([A-Za-z]+))")
+
+
+def _tokenize(query):
+    tokens, pos = [], 0
+    query = query.strip()
+    while pos < len(query):
+        match = _QUERY_TOKEN.match(query, pos)
+        if not match:
+            raise _http_error(400, f'Invalid Value: q={query}')
+        pos = match.end()
+        lparen, rparen, literal, op, word = match.groups()
+        if literal is not None:
+            tokens.append(('lit', re.sub(r"\\(.)", r"\1", literal[1:-1])))
+        else:
+            tokens.append(('sym', lparen or rparen or op or word))
+    return tokens
+
+
+def _parse_query(query):
+    tokens = _tokenize(query)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else (None, None)
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        terms = [parse_and()]
+        while peek() == ('sym', 'or'):
+            take()
+            terms.append(parse_and())
+        return lambda f: any(term(f) for term in terms)
+
+    def parse_and():
+        terms = [parse_term()]
+        while peek() == ('sym', 'and'):
+            take()
+            terms.append(parse_term())
+        return lambda f: all(term(f) for term in terms)
+
+    def parse_term():
+        kind, value = take()
+        if (kind, value) == ('sym', '('):
+            inner = parse_or()
+            take()
+            return inner
+        if (kind, value) == ('sym', 'not'):
+            inner = parse_term()
+            return lambda f: not inner(f)
+        if kind == 'lit':
+            take()  # in
+            take()  # parents
+            return lambda f, parent=value: parent in f.get('parents', [])
+        field = value
+        _, op = take()
+        kind, operand = take()
+        if kind == 'sym':
+            operand = {'true': True, 'false': False}.get(operand, operand)
+        if op == 'contains':
+            # Like Drive: a prefix of the name or of any word in it, ignoring case
+            pattern = re.compile(r'(?<![0-9a-z])' + re.escape(str(operand).lower()))
+            return lambda f: pattern.search(f.get(field, '').lower()) is not None
+        if op == '=':
+            return lambda f: f.get(field, False if field == 'trashed' else None) == operand
+        return lambda f: f.get(field) != operand
+
+    return parse_or()
+
+
+class _Files:
+    def __init__(self, backend):
+        self.b = backend
+
+    def list(self, q=None, fields=None, pageSize=100, pageToken=None, orderBy=None, **kwargs):
+        def handler():
+            match = _parse_query(q) if q else (lambda f: True)
+            items = [f for f in self.b.files.values() if match(f)]
+            start = int(pageToken or 0)
+            size = min(int(pageSize or 100), 1000)
+            page = items[start:start + size]
+            result = {'files': [dict(f) for f in page]}
+            if start + size < len(items):
+                result['nextPageToken'] = str(start + size)
+            return result
+        return FakeRequest(self.b, 'drive.files.list', handler,
+                           dict(kwargs, q=q, fields=fields, pageSize=pageSize, pageToken=pageToken, orderBy=orderBy))
+
+    def get(self, fileId, fields=None, **kwargs):
+        def handler():
+            if fileId not in self.b.files:
+                raise _http_error(404, f'File not found: {fileId}.')
+            return dict(self.b.files[fileId])
+        return FakeRequest(self.b, 'drive.files.get', handler, dict(kwargs, fileId=fileId, fields=fields))
+
+    def create(self, body, fields=None, **kwargs):
+        def handler():
+            return dict(self.b.add_file(body.get('name', 'Untitled'), body.get('mimeType', 'application/octet-stream'),
+                                        body.get('parents', [])))
+        return FakeRequest(self.b, 'drive.files.create', handler, fields=fields)
+
+    def copy(self, fileId, body, fields=None, **kwargs):
+        def handler():
+            if fileId not in self.b.files:
+                raise _http_error(404, f'File not found: {fileId}.')
+            source = self.b.files[fileId]
+            name = body.get('name', f"Copy of {source['name']}")
+            new_file = self.b.add_file(name, source['mimeType'], body.get('parents', source.get('parents', [])))
+            if fileId in self.b.spreadsheets:
+                source_sheets = self.b.spreadsheets[fileId]['sheets']
+                self.b.spreadsheets[new_file['id']] = {
+                    'title': name, 'sheets': {title: [list(row) for row in grid] for title, grid in source_sheets.items()},
+                }
+            return dict(new_file)
+        return FakeRequest(self.b, 'drive.files.copy', handler, fields=fields)
+
+
+class _Permissions:
+    def __init__(self, backend):
+        self.b = backend
+
+    def _require(self, fileId):
+        if fileId not in self.b.files:
+            raise _http_error(404, f'File not found: {fileId}.')
+        return self.b.permissions.setdefault(fileId, [])
+
+    def list(self, fileId, fields=None, **kwargs):
+        def handler():
+            return {'permissions': [dict(p) for p in self._require(fileId)]}
+        return FakeRequest(self.b, 'drive.permissions.list', handler, dict(kwargs, fileId=fileId, fields=fields))
+
+    def create(self, fileId, body, fields=None, **kwargs):
+        def handler():
+            permissions = self._require(fileId)
+            for permission in permissions:
+                if permission['emailAddress'] == body.get('emailAddress'):
+                    permission['role'] = body['role']
+                    return dict(permission)
+            permission = {'id': _new_id(20), 'type': body.get('type', 'user'),
+                          'role': body['role'], 'emailAddress': body.get('emailAddress')}
+            permissions.append(permission)
+            self.b.record_change(fileId)
+            return dict(permission)
+        return FakeRequest(self.b, 'drive.permissions.create', handler, fields=fields)
+
+    def update(self, fileId, permissionId, body, fields=None, **kwargs):
+        def handler():
+            for permission in self._require(fileId):
+                if permission['id'] == permissionId:
+                    permission['role'] = body['role']
+                    self.b.record_change(fileId)
+                    return dict(permission)
+            raise _http_error(404, f'Permission not found: {permissionId}.')
+        return FakeRequest(self.b, 'drive.permissions.update', handler, fields=fields)
+
+
+class _Changes:
+    def __init__(self, backend):
+        self.b = backend
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.b, 'drive.changes.getStartPageToken',
+                           lambda: {'startPageToken': str(len(self.b.change_log) + 1)})
+
+    def list(self, pageToken, pageSize=1000, fields=None, **kwargs):
+        def handler():
+            start = int(pageToken) - 1
+            size = min(int(pageSize or 100), 1000)
+            changes = []
+            for file_id in self.b.change_log[start:start + size]:
+                if isinstance(file_id, tuple):
+                    changes.append({'changeType': 'drive', 'driveId': file_id[1], 'removed': False})
+                elif file_id in self.b.files:
+                    changes.append({'changeType': 'file', 'fileId': file_id, 'removed': False, 'file': dict(self.b.files[file_id])})
+                else:
+                    changes.append({'changeType': 'file', 'fileId': file_id, 'removed': True})
+            result = {'changes': changes}
+            if start + size < len(self.b.change_log):
+                result['nextPageToken'] = str(start + size + 1)
+            else:
+                result['newStartPageToken'] = str(len(self.b.change_log) + 1)
+            return result
+        return FakeRequest(self.b, 'drive.changes.list', handler,
+                           dict(kwargs, pageToken=pageToken, pageSize=pageSize, fields=fields))
+
+
+class FakeDriveService:
+    def __init__(self, backend):
+        self.b = backend
+
+    def files(self):
+        return _Files(self.b)
+
+    def permissions(self):
+        return _Permissions(self.b)
+
+    def changes(self):
+        return _Changes(self.b)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatchRequest(self.b, callback)
+
+
+# A1 helpers for the fake values API
+def _column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _column_letters(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+_CELL = re.compile(r'^([A-Za-z]*)(\d*)$')
+
+
+def _split_range(range_name):
+    if '!' in range_name:
+        sheet, _, cells = range_name.rpartition('!')
+    else:
+        sheet, cells = range_name, ''
+    if len(sheet) >= 2 and sheet[0] == sheet[-1] == "'":
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, cells
+
+
+def _parse_bounds(cells):
+    # Returns (row0, col0, row1, col1) with None meaning unbounded
+    if not cells:
+        return 0, 0, None, None
+    start, _, end = cells.partition(':')
+    end = end or start
+    start_col, start_row = _CELL.match(start).groups()
+    end_col, end_row = _CELL.match(end).groups()
+    row0 = int(start_row) - 1 if start_row else 0
+    col0 = _column_index(start_col) if start_col else 0
+    row1 = int(end_row) - 1 if end_row else None
+    col1 = _column_index(end_col) if end_col else None
+    return row0, col0, row1, col1
+
+
+def _render(value, render_option):
+    if render_option in ('UNFORMATTED_VALUE', 'FORMULA') and isinstance(value, str):
+        try:
+            number = float(value)
+            return int(number) if number.is_integer() and '.' not in value else number
+        except ValueError:
+            return value
+    return value if isinstance(value, str) else ('' if value is None else str(value))
+
+
+class _Values:
+    def __init__(self, backend):
+        self.b = backend
+
+    def _grid(self, spreadsheetId, sheet):
+        spreadsheet = self.b.spreadsheets.get(spreadsheetId)
+        if spreadsheet is None:
+            raise _http_error(404, 'Requested entity was not found.')
+        if sheet not in spreadsheet['sheets']:
+            raise _http_error(400, f'Unable to parse range: {sheet}')
+        return spreadsheet['sheets'][sheet]
+
+    def _read(self, spreadsheetId, range_name, render_option=None):
+        sheet, cells = _split_range(range_name)
+        grid = self._grid(spreadsheetId, sheet)
+        row0, col0, row1, col1 = _parse_bounds(cells)
+        rows = grid[row0:None if row1 is None else row1 + 1]
+        values = []
+        for row in rows:
+            cells_out = [_render(v, render_option) for v in row[col0:None if col1 is None else col1 + 1]]
+            while cells_out and cells_out[-1] == '':
+                cells_out.pop()
+            values.append(cells_out)
+        while values and not values[-1]:
+            values.pop()
+        result = {'range': range_name, 'majorDimension': 'ROWS'}
+        if values:
+            result['values'] = values
+        return result
+
+    def _write(self, spreadsheetId, range_name, values):
+        sheet, cells = _split_range(range_name)
+        grid = self._grid(spreadsheetId, sheet)
+        row0, col0, _, _ = _parse_bounds(cells)
+        for r, row in enumerate(values):
+            target_row = row0 + r
+            while len(grid) <= target_row:
+                grid.append([])
+            target = grid[target_row]
+            for c, value in enumerate(row):
+                while len(target) <= col0 + c:
+                    target.append('')
+                if isinstance(value, bool):
+                    value = 'TRUE' if value else 'FALSE'
+                target[col0 + c] = '' if value is None else str(value)
+        width = max((len(row) for row in values), default=0)
+        return {'spreadsheetId': spreadsheetId, 'updatedRange': range_name,
+                'updatedRows': len(values), 'updatedColumns': width,
+                'updatedCells': sum(len(row) for row in values)}
+
+    def get(self, spreadsheetId, range, valueRenderOption=None, majorDimension=None, fields=None, **kwargs):
+        return FakeRequest(self.b, 'sheets.spreadsheets.values.get',
+                           lambda: self._read(spreadsheetId, range, valueRenderOption),
+                           dict(kwargs, spreadsheetId=spreadsheetId, range=range, valueRenderOption=valueRenderOption,
+                                majorDimension=majorDimension, fields=fields))
+
+    def batchGet(self, spreadsheetId, ranges, valueRenderOption=None, majorDimension=None, fields=None, **kwargs):
+        return FakeRequest(self.b, 'sheets.spreadsheets.values.batchGet', lambda: {
+            'spreadsheetId': spreadsheetId,
+            'valueRanges': [self._read(spreadsheetId, r, valueRenderOption) for r in ranges],
+        }, dict(kwargs, spreadsheetId=spreadsheetId, ranges=ranges, valueRenderOption=valueRenderOption,
+                majorDimension=majorDimension, fields=fields))
+
+    def update(self, spreadsheetId, range, body, valueInputOption=None, fields=None, **kwargs):
+        return FakeRequest(self.b, 'sheets.spreadsheets.values.update',
+                           lambda: self._write(spreadsheetId, range, body.get('values', [])), fields=fields)
+
+    def batchUpdate(self, spreadsheetId, body, fields=None, **kwargs):
+        def handler():
+            responses = [self._write(spreadsheetId, data['range'], data.get('values', [])) for data in body.get('data', [])]
+            return {'spreadsheetId': spreadsheetId, 'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+                    'responses': responses}
+        return FakeRequest(self.b, 'sheets.spreadsheets.values.batchUpdate', handler, fields=fields)
+
+    def _append(self, spreadsheetId, range_name, values):
+        sheet, cells = _split_range(range_name)
+        grid = self._grid(spreadsheetId, sheet)
+        row0, col0, _, col1 = _parse_bounds(cells)
+        # Like Sheets, append after the last row of the table found in the range's columns
+        last = row0 - 1
+        for index in range(row0, len(grid)):
+            row = grid[index][col0:None if col1 is None else col1 + 1]
+            if any(cell != '' for cell in row):
+                last = index
+        start = last + 1
+        end = start + len(values) - 1
+        width = max((len(row) for row in values), default=1)
+        target = f"{sheet}!{_column_letters(col0)}{start + 1}:{_column_letters(col0 + width - 1)}{end + 1}"
+        return {'spreadsheetId': spreadsheetId, 'tableRange': range_name,
+                'updates': self._write(spreadsheetId, target, values)}
+
+    def append(self, spreadsheetId, range, body, valueInputOption=None, insertDataOption=None, fields=None, **kwargs):
+        return FakeRequest(self.b, 'sheets.spreadsheets.values.append',
+                           lambda: self._append(spreadsheetId, range, body.get('values', [])), fields=fields)
+
+
+class _Spreadsheets:
+    def __init__(self, backend):
+        self.b = backend
+
+    def values(self):
+        return _Values(self.b)
+
+    def get(self, spreadsheetId, fields=None, ranges=None, includeGridData=None, **kwargs):
+        def handler():
+            spreadsheet = self.b.spreadsheets.get(spreadsheetId)
+            if spreadsheet is None:
+                raise _http_error(404, 'Requested entity was not found.')
+            wanted = {_split_range(r)[0] for r in ranges} if ranges else None
+            sheets = []
+            for index, (title, grid) in enumerate(spreadsheet['sheets'].items()):
+                if wanted is not None and title not in wanted:
+                    continue
+                sheets.append({'properties': {
+                    'sheetId': index, 'title': title, 'index': index, 'sheetType': 'GRID',
+                    'gridProperties': {'rowCount': max(1000, len(grid)),
+                                       'columnCount': max(26, max((len(r) for r in grid), default=0))},
+                }})
+            return {'spreadsheetId': spreadsheetId, 'properties': {'title': spreadsheet['title']}, 'sheets': sheets}
+        return FakeRequest(self.b, 'sheets.spreadsheets.get', handler,
+                           dict(kwargs, spreadsheetId=spreadsheetId, fields=fields, ranges=ranges, includeGridData=includeGridData))
+
+    def batchUpdate(self, spreadsheetId, body, fields=None, **kwargs):
+        def handler():
+            spreadsheet = self.b.spreadsheets.get(spreadsheetId)
+            if spreadsheet is None:
+                raise _http_error(404, 'Requested entity was not found.')
+            replies = []
+            for request in body.get('requests', []):
+                if 'addSheet' in request:
+                    title = request['addSheet']['properties']['title']
+                    if title in spreadsheet['sheets']:
+                        raise _http_error(400, f'A sheet with the name "{title}" already exists.')
+                    spreadsheet['sheets'][title] = []
+                    replies.append({'addSheet': {'properties': {'title': title}}})
+                else:
+                    replies.append({})
+            return {'spreadsheetId': spreadsheetId, 'replies': replies}
+        return FakeRequest(self.b, 'sheets.spreadsheets.batchUpdate', handler, fields=fields)
+
+
+class FakeSheetsService:
+    def __init__(self, backend):
+        self.b = backend
+
+    def spreadsheets(self):
+        return _Spreadsheets(self.b)
+
+
+# Shared state behind a FakeDriveService / FakeSheetsService pair
+class FakeBackend:
+    def __init__(self, config=None):
+        self.config = config or FakeConfig()
+        self.lock = threading.RLock()
+        self.files = {}
+        self.permissions = {}
+        self.spreadsheets = {}
+        self.change_log = []
+        self.calls = {}
+        self.drive = FakeDriveService(self)
+        self.sheets = FakeSheetsService(self)
+
+    def count_call(self, method_id):
+        with self.lock:
+            self.calls[method_id] = self.calls.get(method_id, 0) + 1
+
+    def record_change(self, file_id):
+        self.change_log.append(file_id)
+
+    # A shared-drive change (changeType "drive"), which carries no fileId
+    def record_drive_change(self, drive_id):
+        self.change_log.append(('drive', drive_id))
+
+    def add_file(self, name, mime_type, parents=(), file_id=None):
+        file_id = file_id or _new_id()
+        url_kind = 'drive/folders' if mime_type == FOLDER_MIME_TYPE else 'file/d'
+        if mime_type == SPREADSHEET_MIME_TYPE:
+            url = f'https://docs.google.com/spreadsheets/d/{file_id}/edit'
+        else:
+            url = f'https://drive.google.com/{url_kind}/{file_id}'
+        self.files[file_id] = {'id': file_id, 'name': name, 'mimeType': mime_type, 'parents': list(parents),
+                               'createdTime': _now(), 'webViewLink': url, 'trashed': False}
+        if mime_type == SPREADSHEET_MIME_TYPE and file_id not in self.spreadsheets:
+            self.spreadsheets[file_id] = {'title': name, 'sheets': {'Sheet1': []}}
+        self.record_change(file_id)
+        return self.files[file_id]
+
+    def add_folder(self, name, parent_id=None, file_id=None):
+        with self.lock:
+            return self.add_file(name, FOLDER_MIME_TYPE, [parent_id] if parent_id else [], file_id)
+
+    def add_spreadsheet(self, name, sheets=None, parent_id=None, file_id=None):
+        with self.lock:
+            spreadsheet = self.add_file(name, SPREADSHEET_MIME_TYPE, [parent_id] if parent_id else [], file_id)
+            self.spreadsheets[spreadsheet['id']] = {
+                'title': name,
+                'sheets': {title: [[str(v) for v in row] for row in grid] for title, grid in (sheets or {'Sheet1': []}).items()},
+            }
+            return spreadsheet
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+# Process-wide backend used when app.py runs with GOOGLE_API_BACKEND=fake
+def default_backend():
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = FakeBackend(FakeConfig.from_env())
+        return _default_backend
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["GOOGLE_API_BACKEND"] = "fake"
+for name in ("DRIVE_REQUESTS_PER_MINUTE", "SHEETS_READS_PER_MINUTE", "SHEETS_WRITES_PER_MINUTE"):
+    os.environ.setdefault(name, "1000000")
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+import fake_google
+
+
+# A fresh in-process Google stand-in per test, injected into the app's service objects
+@pytest.fixture
+def backend():
+    backend = fake_google.FakeBackend()
+    app.drive_service.set(backend.drive)
+    app.spreadsheet_service.set(backend.sheets)
+    yield backend
+    app.drive_service.set(None)
+    app.spreadsheet_service.set(None)
+
+
+@pytest.fixture
+def client(backend):
+    with TestClient(app.app) as client:
+        yield client
@@ -0,0 +1,24 @@
+import asyncio
+
+import httpx
+
+import app
+
+
+ROW = {"video_number": "1", "content_pillar": "p", "video_title": "t", "video_summary": "s", "keywords": "k",
+       "video_description": "d", "tags": "t", "hashtags": "#h", "cta": "c"}
+
+
+def test_fill_gap_appends_take_turns_and_release_their_lock(backend):
+    sheet = backend.add_spreadsheet("Plan", {"Plan": [["", "video_number"]]})
+
+    async def add_rows():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/add_content_plan_row/", json={
+                **ROW, "spreadsheet_id": sheet["id"], "sheet_name": "Plan"}) for _ in range(3)))
+
+    responses = asyncio.run(add_rows())
+    assert sorted(response.json()["message"] for response in responses) == [
+        f"Row {row} updated/added successfully." for row in (2, 3, 4)]
+    assert len(app.content_plan_locks) == 0
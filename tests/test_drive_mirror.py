@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import app
+
+
+def test_sync_skips_shared_drive_changes(backend):
+    root = backend.add_folder("Clients")
+    mirror = app.DriveMirror(max_lag=0)
+    asyncio.run(mirror.seed())
+    backend.record_drive_change("shared-drive-1")
+    added = backend.add_folder("Client A", root["id"])
+    asyncio.run(mirror.sync())
+    assert added["id"] in mirror.files
+    assert mirror.page_token == str(len(backend.change_log) + 1)
+
+
+@pytest.fixture
+def tree(backend):
+    root = backend.add_folder("Clients")
+    folders = [backend.add_folder(name, root["id"]) for name in ("Client Alpha", "Subclient Beta", "alpha-2", "Client Old")]
+    backend.add_file("client notes.txt", "text/plain", [root["id"]])
+    backend.files[folders[-1]["id"]]["trashed"] = True
+    return root
+
+
+def listing(client, method, path, **kwargs):
+    response = client.request(method, path, **kwargs)
+    assert response.status_code == 200
+    return sorted(response.json(), key=lambda item: item.get("id") or item["folder_id"])
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("GET", "/list_files_in_folder/{root}", {}),
+    ("GET", "/list_folders_in_folder/{root}", {}),
+    ("GET", "/list_drive_files", {}),
+    ("POST", "/search_folder_in_folder/", {"json": {"keywords": "client", "parent_folder_id": "{root}"}}),
+    ("POST", "/search_folder_in_folder/", {"json": {"keywords": "alpha", "parent_folder_id": "{root}"}}),
+])
+def test_mirror_answers_listings_like_drive(client, tree, monkeypatch, method, path, kwargs):
+    path = path.format(root=tree["id"])
+    if "json" in kwargs:
+        kwargs = {"json": {key: value.format(root=tree["id"]) for key, value in kwargs["json"].items()}}
+    monkeypatch.setattr(app, "drive_mirror", None)
+    direct = listing(client, method, path, **kwargs)
+    monkeypatch.setattr(app, "drive_mirror", app.DriveMirror(max_lag=60))
+    mirrored = listing(client, method, path, **kwargs)
+    assert mirrored == direct
+
+
+def test_created_folder_is_listed_without_a_sync(client, tree, monkeypatch):
+    mirror = app.DriveMirror(max_lag=60)
+    monkeypatch.setattr(app, "drive_mirror", mirror)
+    client.get(f"/list_folders_in_folder/{tree['id']}")
+    syncs = mirror.syncs
+    client.post("/create_folder", json={"parent_folder_id": tree["id"], "folder_name": "Client Gamma"})
+    names = [item["name"] for item in client.get(f"/list_folders_in_folder/{tree['id']}").json()]
+    assert "Client Gamma" in names
+    assert mirror.syncs == syncs
@@ -0,0 +1,41 @@
+import asyncio
+
+import app
+
+
+class ValuesGet:
+    method = "GET"
+    methodId = "sheets.spreadsheets.values.get"
+    uri = "https://sheets.googleapis.com/v4/spreadsheets/S1/values/Plan"
+
+
+def test_read_after_a_write_does_not_join_an_older_flight(monkeypatch):
+    calls = []
+
+    async def execute(request):
+        calls.append(request)
+        call_number = len(calls)
+        await asyncio.sleep(0.05)
+        return call_number
+
+    monkeypatch.setattr(app, "execute", execute)
+
+    async def scenario():
+        before = [asyncio.ensure_future(app.execute_async(ValuesGet(), coalesce=True, resource_id="S1")) for _ in range(2)]
+        await asyncio.sleep(0)
+        app.worksheet_snapshots.invalidate("S1")
+        after = await app.execute_async(ValuesGet(), coalesce=True, resource_id="S1")
+        return [await flight for flight in before], after
+
+    before, after = asyncio.run(scenario())
+    assert before == [1, 1]
+    assert after == 2
+
+
+def test_write_log_falls_back_to_the_newest_dropped_write():
+    log = app.WriteLog(maxsize=2)
+    for resource_id in ("a", "b", "c"):
+        log.record(resource_id)
+    assert log.generation("a") == 1
+    assert log.generation("c") == 3
+    assert log.generation(None) == 3
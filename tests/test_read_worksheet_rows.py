@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def plan(backend):
+    rows = [["video_number", "video_title"]] + [[str(number), f"Video {number}"] for number in range(1, 11)]
+    return backend.add_spreadsheet("Content plan", {"Plan": rows})
+
+
+def read_compact(client, plan, **body):
+    response = client.post("/read_worksheet_rows", json={"spreadsheet_id": plan["id"], "sheet_name": "Plan",
+                                                         "format": "compact", **body})
+    assert response.status_code == 200
+    return json.loads(response.text)
+
+
+@pytest.mark.parametrize("offset, first", [(0, 1), (1, 2)])
+def test_compact_limit_and_offset_skip_the_header_row(client, plan, offset, first):
+    result = read_compact(client, plan, offset=offset, limit=4)
+    assert result["header"] == ["video_number", "video_title"]
+    assert len(result["rows"]) == 4
+    assert result["rows"][0] == [first, f"Video {first}"]
+
+
+def test_compact_range_below_the_header_is_not_shifted(client, plan):
+    result = read_compact(client, plan, range="A3:B5")
+    assert [row[0] for row in result["rows"]] == [2, 3, 4]
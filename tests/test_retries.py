@@ -0,0 +1,21 @@
+import httplib2
+from googleapiclient.errors import HttpError
+
+import app
+
+
+class Request:
+    def __init__(self, method_id):
+        self.methodId = method_id
+
+
+def server_error():
+    return HttpError(httplib2.Response({"status": 503}), b"{}")
+
+
+def test_structural_batch_update_is_not_retried_after_a_server_error():
+    assert app.retry_delay(Request("sheets.spreadsheets.batchUpdate"), server_error(), 0) is None
+
+
+def test_reads_are_retried_after_a_server_error():
+    assert app.retry_delay(Request("sheets.spreadsheets.values.get"), server_error(), 0) is not None